@@ -1,241 +1,434 @@
 # Run this app with `python app.py` and
 # visit http://127.0.0.1:8050/ in your web browser.
 
+import json
+import os
+import threading
 import plotly.express as px
 import plotly.graph_objects as go
 import dash_bootstrap_components as dbc
 import pandas as pd
 import plotly.io as pio
-from dash import Dash, html, dcc, Input, Output
+from plotly.utils import PlotlyJSONEncoder
+from dash import Dash, html, dcc, ctx, no_update, Input, Output, State
+from dash.exceptions import PreventUpdate
+from flask import Response, jsonify, request
+from concurrent.futures import ThreadPoolExecutor
+import coalescing
+import export
+import http_responses
+import metrics
+from figure_cache import FileFigureCache, MemoryFigureCache
 from create_app_assets import (
-    create_part_to_whole,
-    create_time_series,
-    create_bubbles,
-    DF_ROB,
+    query_date_range,
+    query_export,
+    EXPORTS,
+    query_bubble_clusters,
+    bubble_viewport,
+    get_dataset,
+    is_dataset_loaded,
+    start_loading,
+    add_refresh_listener,
+    RobDataset,
+    BubbleViewport,
+    DatasetSummary,
+    summarize_dataset,
+    start_refresher,
+    REFRESH_INTERVAL,
 )
 
 # Theme for plotly plots
 pio.templates.default = "simple_white"
 
+# Optional directory of the figure cache, so it can be shared by all worker processes on a machine
+FIGURE_CACHE_DIR = os.environ.get("ROB_FIGURE_CACHE_DIR")
+# Maximal size of the figure cache in bytes
+FIGURE_CACHE_MAX_BYTES = int(os.environ.get("ROB_FIGURE_CACHE_MAX_BYTES", str(2**26)))
+
+# Serialized figures per version of the data and date range, see `_serialize_figures`
+if FIGURE_CACHE_DIR:
+    FIGURE_CACHE = FileFigureCache(FIGURE_CACHE_DIR, FIGURE_CACHE_MAX_BYTES)
+else:
+    FIGURE_CACHE = MemoryFigureCache(FIGURE_CACHE_MAX_BYTES)
+
+# Seasons whose charts are prewarmed for every year as first month and number of months, i.e., spring, summer, autumn,
+# and winter, see `prewarm_figure_cache`
+SEASONS = ((3, 3), (6, 3), (9, 3), (12, 3))
+
+# View of the bubble map when the app is opened
+BUBBLES_ZOOM = 6.5
+BUBBLES_CENTER = dict(lat=54.43388, lon=9.57109)
+_INITIAL_BUBBLE_VIEWPORT = bubble_viewport(BUBBLES_ZOOM)
+
+# Charts updated by `update_figures`, part of the keys of the figure cache, so cached charts always match the layout
+_CHARTS = ("fig-part-to-whole", "fig-bubbles", "fig-time-series", "fig-length-of-stay")
+
+# Builds the figures of a date range in parallel, see `_serialize_figures`
+_FIGURE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rob-figure")
+# Builds the figures of concurrent identical requests once, see `_serialize_figures` and `_serialize_bubbles`
+_FIGURE_FLIGHTS = coalescing.SingleFlight()
+# Latest request of every browser session, see `update_figures`
+_LATEST_REQUESTS = coalescing.LatestRequests()
+
 # App
 app = Dash(
     __name__,
     external_stylesheets=[
         dbc.themes.BOOTSTRAP,
-        "/static/seehundstation_friedrichskoog.css",
+        http_responses.static_url("seehundstation_friedrichskoog.css"),
     ],
+    # The components of the loading state and of the app are never in the layout at the same time
+    suppress_callback_exceptions=True,
 )
 
-app.layout = html.Div(
-    [
-        html.A(
-            href="https://unsplash.com/@hen63",
-            children=[
-                html.Img(
-                    src="/static/img/Seehundheader2.png",
-                    alt="A cute baby seal",
-                    style={"width": "100%"},
-                )
-            ],
-        ),
-        html.Div(
-            [
-                html.Small(
-                    children=[
-                        "Daten werden bereitgestellt durch die ",
-                        html.A(
-                            href="https://www.seehundstation-friedrichskoog.de/",
-                            children="Seehundstation Friedrichskoog ",
-                            style={"color": "#004d9e"},
-                        ),
-                        "(zuletzt aktualisiert am {}).".format(
-                            DF_ROB["Sys_aktualisiert_am"].max().strftime("%d.%m.%Y")
-                        ),
-                    ]
-                )
-            ],
-            style={"background-color": "#e9e2d8"},
-        ),
-        html.Div(html.P("")),
-        html.Div(
-            [
-                dbc.Container(
-                    dbc.Card(
-                        [
-                            html.Div(
-                                [
-                                    html.Div(
-                                        [
-                                            dbc.Row(
-                                                [
-                                                    dbc.Col(
-                                                        html.Div(
-                                                            dcc.Graph(
-                                                                id="fig-part-to-whole"
+# Compress responses, answer repeated requests with 304 (Not Modified), and let browsers cache static files
+http_responses.install(
+    app.server, lambda: get_dataset().version if is_dataset_loaded() else None
+)
+
+# Load the data in the background, so the server can respond while the data is loading
+start_loading()
+
+
+def default_date_range(summary: DatasetSummary) -> tuple:
+    """
+    Computes the date range that is selected when the app is opened, i.e., the whole history of the data.
+
+    Parameters
+    ----------
+    summary
+        statistics of the data about seals admitted to the Seehundstation Friedrichskoog, see `summarize_dataset`.
+
+    Returns
+    -------
+    A tuple of the start date and the end date.
+    """
+    return (
+        pd.Timestamp(summary.first_admission - pd.Timedelta(days=14)).date(),
+        pd.Timestamp(summary.last_created + pd.Timedelta(days=14)).date(),
+    )
+
+
+def serve_loading_layout() -> html.Div:
+    """
+    Builds the layout that is served while the data is loading. It polls the server and reloads the page once the data
+    has been loaded.
+
+    Returns
+    -------
+    The layout of the loading state.
+    """
+    return html.Div(
+        [
+            html.Img(
+                src=http_responses.static_url("img/Seehundheader2.png"),
+                alt="A cute baby seal",
+                style={"width": "100%"},
+            ),
+            dbc.Container(
+                dbc.Spinner(
+                    html.P(
+                        "Die Daten werden geladen. Die Seite wird automatisch aktualisiert.",
+                        style={"margin-top": "60px"},
+                    ),
+                    color="#004d9e",
+                ),
+                style={"text-align": "center", "margin-top": "40px"},
+            ),
+            dcc.Interval(id="loading-interval", interval=1000),
+            dcc.Store(id="loading-done"),
+        ]
+    )
+
+
+def serve_layout() -> html.Div:
+    """
+    Builds the layout of the app. The layout is built on every page load, so it always reflects the current snapshot
+    of the data. The charts of the default date range are embedded in the layout, so they are displayed without any
+    callback request. They are cached per version of the data and rebuilt when the data is refreshed, see
+    `prewarm_figure_cache`. While the data is loading, the layout of the loading state is served instead.
+
+    Returns
+    -------
+    The layout of the app.
+    """
+    if not is_dataset_loaded():
+        return serve_loading_layout()
+    dataset = get_dataset()
+    summary = summarize_dataset(dataset)
+    start_date, end_date = default_date_range(summary)
+    figures = dict(
+        zip(
+            _CHARTS,
+            json.loads(_serialize_figures(dataset, str(start_date), str(end_date))),
+        )
+    )
+    return html.Div(
+        [
+            html.A(
+                href="https://unsplash.com/@hen63",
+                children=[
+                    html.Img(
+                        src=http_responses.static_url("img/Seehundheader2.png"),
+                        alt="A cute baby seal",
+                        style={"width": "100%"},
+                    )
+                ],
+            ),
+            html.Div(
+                [
+                    html.Small(
+                        children=[
+                            "Daten werden bereitgestellt durch die ",
+                            html.A(
+                                href="https://www.seehundstation-friedrichskoog.de/",
+                                children="Seehundstation Friedrichskoog ",
+                                style={"color": "#004d9e"},
+                            ),
+                            "(zuletzt aktualisiert am {}).".format(
+                                summary.last_updated.strftime("%d.%m.%Y")
+                            ),
+                        ]
+                    )
+                ],
+                style={"background-color": "#e9e2d8"},
+            ),
+            html.Div(html.P("")),
+            html.Div(
+                [
+                    dbc.Container(
+                        dbc.Card(
+                            [
+                                html.Div(
+                                    [
+                                        html.Div(
+                                            [
+                                                dbc.Row(
+                                                    [
+                                                        dbc.Col(
+                                                            html.Div(
+                                                                dcc.Graph(
+                                                                    id="fig-part-to-whole",
+                                                                    figure=figures[
+                                                                        "fig-part-to-whole"
+                                                                    ],
+                                                                ),
+                                                                style={
+                                                                    "width": "100%",
+                                                                    "height": "400px",
+                                                                },
                                                             ),
-                                                            style={
-                                                                "width": "100%",
-                                                                "height": "400px",
-                                                            },
+                                                            width=3,
                                                         ),
-                                                        width=3,
-                                                    ),
-                                                    dbc.Col(
-                                                        html.Div(
-                                                            [
-                                                                html.P(
-                                                                    [
-                                                                        "Willkommen Robben-Freund!",
-                                                                        html.Br(),
-                                                                        "Hier kannst du Informationen zu den Robbenfunden der ",
-                                                                        html.A(
-                                                                            href="https://www.seehundstation-friedrichskoog.de/",
-                                                                            children="Seehundstation Friedrichskoog ",
-                                                                            style={
-                                                                                "color": "#004d9e"
-                                                                            },
-                                                                        ),
-                                                                        "untersuchen.",
-                                                                    ]
-                                                                ),
-                                                                html.P(
-                                                                    [
-                                                                        "Im Diagramm links siehst du den Anteil der",
-                                                                        html.A(
-                                                                            children=" in Reha befindlichen",
-                                                                            style={
-                                                                                "color": "#94613d"
-                                                                            },
-                                                                        ),
-                                                                        ", ",
-                                                                        html.A(
-                                                                            children="ausgewilderten",
-                                                                            style={
-                                                                                "color": "#3d8c18"
-                                                                            },
-                                                                        ),
-                                                                        " und ",
-                                                                        html.A(
-                                                                            children="verstorbenen",
-                                                                            style={
-                                                                                "color": "#101a1c"
-                                                                            },
-                                                                        ),
-                                                                        " Robben  im Zeitraum: ",
-                                                                        html.A(
-                                                                            dcc.DatePickerRange(
-                                                                                id="date-picker",
-                                                                                start_date_placeholder_text="Start Period",
-                                                                                end_date_placeholder_text="End Period",
-                                                                                calendar_orientation="vertical",
-                                                                                start_date=pd.Timestamp(
-                                                                                    DF_ROB[
-                                                                                        "Einlieferungsdatum"
-                                                                                    ].min()
-                                                                                    - pd.Timedelta(
-                                                                                        days=14
-                                                                                    )
-                                                                                ).date(),
-                                                                                end_date=pd.Timestamp(
-                                                                                    DF_ROB[
-                                                                                        "Erstellt_am"
-                                                                                    ].max()
-                                                                                    + pd.Timedelta(
-                                                                                        days=14
-                                                                                    )
-                                                                                ).date(),
-                                                                                display_format="D.M.Y",
-                                                                            )
-                                                                        ),
-                                                                        html.Br(),
-                                                                        "Unter diesem Text siehst du eine Karte, in der die ungefähren Fundorte der eingelieferten Robben "
-                                                                        "eingetragen sind.",
-                                                                        html.Br(),
-                                                                        "Im letzten Bild kannst du dir ansehen, wann wie viele Robben in die Station eingeliefert worden sind.",
-                                                                    ]
-                                                                ),
-                                                                html.P(
-                                                                    [
-                                                                        "Wenn du ein bestimmtes Zeitfenster genauer betrachten möchtest,"
-                                                                        " musst du nur die obigen Daten anpassen, um den Start- bzw. den Endzeitpunkt zu verändern.",
-                                                                        html.Br(),
-                                                                        "Probier es doch mal aus 😄 Viel Spaß! ",
-                                                                        html.A(
-                                                                            href="https://www.mirjam-kirchner.com/",
-                                                                            children="🐼💚",
-                                                                        ),
-                                                                    ]
-                                                                ),
-                                                                html.P(
-                                                                    [
-                                                                        html.A(
-                                                                            children="Das kannst du tun:",
-                                                                            style={
-                                                                                "color": "#0d6efd"
-                                                                            },
-                                                                        ),
-                                                                        html.Br(),
-                                                                        dbc.Button(
-                                                                            "Robben helfen!",
-                                                                            href="https://www.seehundstation-friedrichskoog.de/spenden/",
-                                                                        ),
-                                                                        " ",
-                                                                        dbc.Button(
-                                                                            "Source Code ansehen!",
-                                                                            href="https://github.com/MirjamKirchner/rob-oliver",
-                                                                        ),
-                                                                    ]
-                                                                ),
-                                                            ]
-                                                        )
-                                                    ),
-                                                ]
+                                                        dbc.Col(
+                                                            html.Div(
+                                                                [
+                                                                    html.P(
+                                                                        [
+                                                                            "Willkommen Robben-Freund!",
+                                                                            html.Br(),
+                                                                            "Hier kannst du Informationen zu den Robbenfunden der ",
+                                                                            html.A(
+                                                                                href="https://www.seehundstation-friedrichskoog.de/",
+                                                                                children="Seehundstation Friedrichskoog ",
+                                                                                style={
+                                                                                    "color": "#004d9e"
+                                                                                },
+                                                                            ),
+                                                                            "untersuchen.",
+                                                                        ]
+                                                                    ),
+                                                                    html.P(
+                                                                        [
+                                                                            "Im Diagramm links siehst du den Anteil der",
+                                                                            html.A(
+                                                                                children=" in Reha befindlichen",
+                                                                                style={
+                                                                                    "color": "#94613d"
+                                                                                },
+                                                                            ),
+                                                                            ", ",
+                                                                            html.A(
+                                                                                children="ausgewilderten",
+                                                                                style={
+                                                                                    "color": "#3d8c18"
+                                                                                },
+                                                                            ),
+                                                                            " und ",
+                                                                            html.A(
+                                                                                children="verstorbenen",
+                                                                                style={
+                                                                                    "color": "#101a1c"
+                                                                                },
+                                                                            ),
+                                                                            " Robben  im Zeitraum: ",
+                                                                            html.A(
+                                                                                dcc.DatePickerRange(
+                                                                                    id="date-picker",
+                                                                                    start_date_placeholder_text="Start Period",
+                                                                                    end_date_placeholder_text="End Period",
+                                                                                    calendar_orientation="vertical",
+                                                                                    start_date=start_date,
+                                                                                    end_date=end_date,
+                                                                                    display_format="D.M.Y",
+                                                                                )
+                                                                            ),
+                                                                            html.Br(),
+                                                                            "Unter diesem Text siehst du eine Karte, in der die ungefähren Fundorte der eingelieferten Robben "
+                                                                            "eingetragen sind.",
+                                                                            html.Br(),
+                                                                            "Darunter kannst du dir ansehen, wann wie viele Robben in die Station eingeliefert worden sind, "
+                                                                            "und im letzten Bild, wie viele Wochen die ausgewilderten und verstorbenen Robben in der Station verbracht haben.",
+                                                                        ]
+                                                                    ),
+                                                                    html.P(
+                                                                        [
+                                                                            "Wenn du ein bestimmtes Zeitfenster genauer betrachten möchtest,"
+                                                                            " musst du nur die obigen Daten anpassen, um den Start- bzw. den Endzeitpunkt zu verändern.",
+                                                                            html.Br(),
+                                                                            "Probier es doch mal aus 😄 Viel Spaß! ",
+                                                                            html.A(
+                                                                                href="https://www.mirjam-kirchner.com/",
+                                                                                children="🐼💚",
+                                                                            ),
+                                                                        ]
+                                                                    ),
+                                                                    html.P(
+                                                                        [
+                                                                            html.A(
+                                                                                children="Das kannst du tun:",
+                                                                                style={
+                                                                                    "color": "#0d6efd"
+                                                                                },
+                                                                            ),
+                                                                            html.Br(),
+                                                                            dbc.Button(
+                                                                                "Robben helfen!",
+                                                                                href="https://www.seehundstation-friedrichskoog.de/spenden/",
+                                                                            ),
+                                                                            " ",
+                                                                            dbc.Button(
+                                                                                "Source Code ansehen!",
+                                                                                href="https://github.com/MirjamKirchner/rob-oliver",
+                                                                            ),
+                                                                        ]
+                                                                    ),
+                                                                ]
+                                                            )
+                                                        ),
+                                                    ]
+                                                )
+                                            ]
+                                        ),
+                                        html.Div(
+                                            dcc.Graph(
+                                                id="fig-bubbles",
+                                                figure=figures["fig-bubbles"],
+                                            )
+                                        ),
+                                        html.Div(
+                                            dcc.Graph(
+                                                id="fig-time-series",
+                                                figure=figures["fig-time-series"],
                                             )
-                                        ]
-                                    ),
-                                    html.Div(dcc.Graph(id="fig-bubbles")),
-                                    html.Div(dcc.Graph(id="fig-time-series")),
-                                ]
-                            )
-                        ],
-                        color="#e9e2d8",
-                        style={"border-radius": "10px"},
+                                        ),
+                                        html.Div(
+                                            dcc.Graph(
+                                                id="fig-length-of-stay",
+                                                figure=figures["fig-length-of-stay"],
+                                            )
+                                        ),
+                                    ]
+                                )
+                            ],
+                            color="#e9e2d8",
+                            style={"border-radius": "10px"},
+                        )
                     )
-                )
-            ]
-        ),
-        html.Div(html.P("")),
-    ]
-)
+                ]
+            ),
+            html.Div(html.P("")),
+            # Identifies the browser session, so superseded requests can be skipped, see `update_figures`
+            dcc.Store(id="session-id"),
+        ]
+    )
+
+
+app.layout = serve_layout
 
 
 @app.callback(
-    Output("fig-part-to-whole", "figure"),
-    Input("date-picker", "start_date"),
-    Input("date-picker", "end_date"),
+    Output("loading-done", "data"),
+    Input("loading-interval", "n_intervals"),
 )
-def update_fig_part_to_whole(start_date: str, end_date: str) -> go.Figure:
+@metrics.instrument_callback
+def poll_loading(n_intervals: int) -> bool:
     """
-    Updates the donut chart displaying the fraction of animals in rehabilitation, released, and dead based on the
-    selected date range.
+    Reports whether the data has been loaded, so the loading state can be replaced by the app.
 
     Parameters
     ----------
-    start_date
-        Start date of the considered time period.
+    n_intervals
+        number of polls so far.
 
-    end_date
-        End date of the considered time period.
+    Returns
+    -------
+    `True` once the data has been loaded.
+    """
+    if not is_dataset_loaded():
+        raise PreventUpdate
+    return True
+
+
+# Reload the page to serve the layout of the app once the data has been loaded
+app.clientside_callback(
+    """
+    function(done) {
+        if (done) {
+            window.location.reload();
+        }
+        return Boolean(done);
+    }
+    """,
+    Output("loading-interval", "disabled"),
+    Input("loading-done", "data"),
+)
+
+# Generate the ID of the browser session in the browser, as the layout may be reused from the browser cache
+app.clientside_callback(
+    """
+    function(_, sessionId) {
+        if (sessionId) {
+            return window.dash_clientside.no_update;
+        }
+        return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+    """,
+    Output("session-id", "data"),
+    Input("session-id", "modified_timestamp"),
+    State("session-id", "data"),
+)
+
+# Refresh the data in the background, so new admissions show up without restarting the app
+if REFRESH_INTERVAL > 0:
+    start_refresher(REFRESH_INTERVAL)
+
+
+@metrics.instrument("figure_construction")
+def build_fig_part_to_whole(ds_part_to_whole: pd.Series) -> go.Figure:
+    """
+    Builds the donut chart displaying the fraction of animals in rehabilitation, released, and dead.
+
+    Parameters
+    ----------
+    ds_part_to_whole
+        count of animals per status, see `create_part_to_whole`.
 
     Returns
     -------
         A `plotly.graph_objects`-figure describing a donut chart.
     """
-    min_date = pd.to_datetime(start_date, format="%Y-%m-%d")
-    max_date = pd.to_datetime(end_date, format="%Y-%m-%d")
-
-    ds_part_to_whole = create_part_to_whole(min_date=min_date, max_date=max_date)
-    ds_part_to_whole.sort_index(inplace=True)
+    ds_part_to_whole = ds_part_to_whole.sort_index()
 
     fig_part_to_whole = go.Figure(
         data=[
@@ -277,32 +470,21 @@ def update_fig_part_to_whole(start_date: str, end_date: str) -> go.Figure:
     return fig_part_to_whole
 
 
-@app.callback(
-    Output("fig-bubbles", "figure"),
-    Input("date-picker", "start_date"),
-    Input("date-picker", "end_date"),
-)
-def update_fig_bubbles(start_date: str, end_date: str) -> go.Figure:
+@metrics.instrument("figure_construction")
+def build_fig_bubbles(df_bubbles: pd.DataFrame) -> go.Figure:
     """
-    Updates the bubble chart displaying the count of seals at different finding places and the location of the
-    Seehundstation Friedrichskoog based on the selected date range.
+    Builds the bubble chart displaying the count of seals at different finding places and the location of the
+    Seehundstation Friedrichskoog.
 
     Parameters
     ----------
-    start_date
-        Start date of the considered time period.
-
-    end_date
-        End date of the considered time period.
+    df_bubbles
+        count of animals per finding place (or per cluster of finding places), see `query_bubble_clusters`.
 
     Returns
     -------
     A `plotly.graph_objects`-figure describing a bubble chart.
     """
-    min_date = pd.to_datetime(start_date, format="%Y-%m-%d")
-    max_date = pd.to_datetime(end_date, format="%Y-%m-%d")
-    df_bubbles = create_bubbles(max_date=max_date, min_date=min_date)
-
     fig_bubbles = go.Figure()
 
     # finding places
@@ -314,20 +496,15 @@ def update_fig_bubbles(start_date: str, end_date: str) -> go.Figure:
             marker=go.scattermapbox.Marker(
                 color="#FF7F3F",
                 size=df_bubbles["Anzahl"],
-                sizeref=df_bubbles["Anzahl"].max() / (17**2),
+                sizeref=max(df_bubbles["Anzahl"].max(), 1) / (17**2),
                 sizemin=3,
                 sizemode="area",
             ),
-            text=(
-                pd.Series(["Fundort"] * df_bubbles["Fundort"].size).str.cat(
-                    df_bubbles["Fundort"].astype(str), sep=": "
-                )
-            ).str.cat(
-                pd.Series(["Anzahl"] * df_bubbles["Anzahl"].size).str.cat(
-                    df_bubbles["Anzahl"].astype(str), sep=": "
-                ),
-                sep="<br>",
-            ),
+            # Built without the `str` accessor, which fails if no seals have been admitted in the date range
+            text="Fundort: "
+            + df_bubbles["Fundort"].astype(str)
+            + "<br>Anzahl: "
+            + df_bubbles["Anzahl"].astype(str),
             hoverinfo="text",
             name="Fundort",
         )
@@ -348,9 +525,11 @@ def update_fig_bubbles(start_date: str, end_date: str) -> go.Figure:
     fig_bubbles.update_layout(
         mapbox=dict(
             style="carto-positron",  # "open-street-map", "white-bg", "carto- positron", "carto-darkmatter"
-            zoom=6.5,
-            center=dict(lat=54.43388, lon=9.57109),
+            zoom=BUBBLES_ZOOM,
+            center=BUBBLES_CENTER,
         ),
+        # Keeps the view of the user when the bubbles are updated
+        uirevision="bubbles",
         margin=dict(l=0, r=0, t=0, b=0),
         paper_bgcolor="rgba(0, 0, 0, 0)",
         plot_bgcolor="rgba(0, 0, 0, 0)",
@@ -366,31 +545,20 @@ def update_fig_bubbles(start_date: str, end_date: str) -> go.Figure:
     return fig_bubbles
 
 
-@app.callback(
-    Output("fig-time-series", "figure"),
-    Input("date-picker", "start_date"),
-    Input("date-picker", "end_date"),
-)
-def update_fig_time_series(start_date: str, end_date: str) -> px.line:
+@metrics.instrument("figure_construction")
+def build_fig_time_series(df_time_series_range: pd.DataFrame) -> px.line:
     """
-    Updates the time-series chart displaying the count of animals admitted to the Seehundstation Friedrichskoog based on
-    the selected date range.
+    Builds the time-series chart displaying the count of animals admitted to the Seehundstation Friedrichskoog.
 
     Parameters
     ----------
-    start_date
-        Start date of the considered time period.
-
-    end_date
-        End date of the considered time period.
+    df_time_series_range
+        count of admitted animals per `Tierart` and week, month, quarter, or year, see `create_adaptive_time_series`.
 
     Returns
     -------
     A `plotly.express.line`-figure describing a time-series chart.
     """
-    min_date = pd.to_datetime(start_date, format="%Y-%m-%d")
-    max_date = pd.to_datetime(end_date, format="%Y-%m-%d")
-    df_time_series_range = create_time_series(max_date=max_date, min_date=min_date)
     color_discrete_map = {
         "Seehund": "#086E7D",
         "Kegelrobbe": "#34BE82",
@@ -398,7 +566,8 @@ def update_fig_time_series(start_date: str, end_date: str) -> px.line:
     }
     fig_time_series = px.line(
         df_time_series_range,
-        x="Einlieferungswoche",
+        # The name of the time column depends on the resolution of the time series
+        x=df_time_series_range.columns[1],
         y="Anzahl",
         color="Tierart",
         markers=True,
@@ -412,5 +581,405 @@ def update_fig_time_series(start_date: str, end_date: str) -> px.line:
     return fig_time_series
 
 
+@metrics.instrument("figure_construction")
+def build_fig_length_of_stay(df_length_of_stay: pd.DataFrame) -> px.bar:
+    """
+    Builds the histogram displaying how many weeks the released and the deceased animals have stayed in the
+    Seehundstation Friedrichskoog, per `Tierart`.
+
+    Parameters
+    ----------
+    df_length_of_stay
+        count of animals per `Tierart`, outcome, and length of stay in weeks, see `create_length_of_stay`.
+
+    Returns
+    -------
+    A `plotly.express.bar`-figure describing a histogram per `Tierart`.
+    """
+    color_discrete_map = {
+        "Ausgewildert": "#3d8c18",
+        "Verstorben": "#101a1c",
+    }
+    fig_length_of_stay = px.bar(
+        df_length_of_stay,
+        x="Verweildauer",
+        y="Anzahl",
+        color="Ausgang",
+        # Facets cannot be built without data
+        facet_col="Tierart" if len(df_length_of_stay) else None,
+        category_orders={"Ausgang": list(color_discrete_map)},
+        color_discrete_map=color_discrete_map,
+        labels={"Verweildauer": "Verweildauer in Wochen"},
+    )
+    fig_length_of_stay.update_layout(
+        legend=dict(orientation="h", yanchor="bottom", y=1.08, xanchor="left", x=0),
+        paper_bgcolor="rgba(0, 0, 0, 0)",
+        plot_bgcolor="rgba(0, 0, 0, 0)",
+    )
+    # Shows "Seehund" instead of "Tierart=Seehund" above the histograms
+    fig_length_of_stay.for_each_annotation(
+        lambda annotation: annotation.update(text=annotation.text.split("=")[-1])
+    )
+    return fig_length_of_stay
+
+
+def _skip_if_superseded(request_ticket: tuple):
+    """
+    Stops the current callback if a later request of the same browser session has superseded it.
+
+    Parameters
+    ----------
+    request_ticket
+        tuple of the session ID, the kind, and the sequence number of the request (see `coalescing.LatestRequests`),
+        or `None` if the request cannot be superseded.
+    """
+    if request_ticket is not None and _LATEST_REQUESTS.is_superseded(*request_ticket):
+        raise PreventUpdate
+
+
+def _serialize_figures(
+    dataset: RobDataset, start_date: str, end_date: str, request_ticket: tuple = None
+) -> str:
+    """
+    Builds the donut chart, the bubble chart, the time-series chart, and the length-of-stay chart for the selected date
+    range and serializes them to JSON. Serialized charts are cached per version of the data and date range. Concurrent
+    identical requests build the charts once, and a superseded request (see `_skip_if_superseded`) stops before building
+    them.
+
+    Parameters
+    ----------
+    dataset
+        snapshot of the data.
+
+    start_date
+        Start date of the considered time period.
+
+    end_date
+        End date of the considered time period.
+
+    request_ticket
+        ticket of the request, see `_skip_if_superseded`.
+
+    Returns
+    -------
+    A JSON array of the charts in the order of `_CHARTS`.
+    """
+    key = (dataset.version, str(start_date), str(end_date), ",".join(_CHARTS))
+    payload = FIGURE_CACHE.get(key)
+    if payload is None:
+        range_query = query_date_range(start_date, end_date, dataset)
+        # A request of another session may wait for the charts, so they are built completely once started
+        _skip_if_superseded(request_ticket)
+        payload = _FIGURE_FLIGHTS.do(
+            key, _build_figures_payload, key, dataset, start_date, end_date, range_query
+        )
+    return payload
+
+
+def _build_figures_payload(
+    key: tuple, dataset: RobDataset, start_date: str, end_date: str, range_query
+) -> str:
+    """
+    Builds the charts of `_serialize_figures` in parallel and caches them as JSON under `key`.
+    """
+    futures = [
+        metrics.submit(
+            _FIGURE_POOL, build_fig_part_to_whole, range_query.part_to_whole
+        ),
+        metrics.submit(
+            _FIGURE_POOL,
+            build_fig_bubbles,
+            query_bubble_clusters(
+                start_date, end_date, _INITIAL_BUBBLE_VIEWPORT, dataset
+            ),
+        ),
+        metrics.submit(_FIGURE_POOL, build_fig_time_series, range_query.time_series),
+        metrics.submit(
+            _FIGURE_POOL, build_fig_length_of_stay, range_query.length_of_stay
+        ),
+    ]
+    figures = [future.result() for future in futures]
+    with metrics.stage("json_serialization"):
+        payload = json.dumps(figures, cls=PlotlyJSONEncoder)
+    FIGURE_CACHE.put(key, payload)
+    return payload
+
+
+def _serialize_bubbles(
+    dataset: RobDataset, start_date: str, end_date: str, viewport: BubbleViewport
+) -> str:
+    """
+    Builds the bubble chart for the selected date range and the visible part of the map and serializes it to JSON.
+    Serialized charts are cached per version of the data, date range, and viewport, and concurrent identical requests
+    build the chart once.
+
+    Parameters
+    ----------
+    dataset
+        snapshot of the data.
+
+    start_date
+        Start date of the considered time period.
+
+    end_date
+        End date of the considered time period.
+
+    viewport
+        visible part of the map, see `bubble_viewport`.
+
+    Returns
+    -------
+    The bubble chart as JSON.
+    """
+    key = (dataset.version, str(start_date), str(end_date), "bubbles") + tuple(
+        str(value) for value in viewport
+    )
+    payload = FIGURE_CACHE.get(key)
+    if payload is None:
+        payload = _FIGURE_FLIGHTS.do(
+            key, _build_bubbles_payload, key, dataset, start_date, end_date, viewport
+        )
+    return payload
+
+
+def _build_bubbles_payload(
+    key: tuple,
+    dataset: RobDataset,
+    start_date: str,
+    end_date: str,
+    viewport: BubbleViewport,
+) -> str:
+    """
+    Builds the chart of `_serialize_bubbles` and caches it as JSON under `key`.
+    """
+    fig_bubbles = build_fig_bubbles(
+        query_bubble_clusters(start_date, end_date, viewport, dataset)
+    )
+    with metrics.stage("json_serialization"):
+        payload = json.dumps(fig_bubbles, cls=PlotlyJSONEncoder)
+    FIGURE_CACHE.put(key, payload)
+    return payload
+
+
+def _bubble_viewport(relayout_data: dict):
+    """
+    Extracts the visible part of the bubble map from its `relayoutData`.
+
+    Parameters
+    ----------
+    relayout_data
+        last change of the view of the bubble map, e.g., after zooming or panning.
+
+    Returns
+    -------
+    A `BubbleViewport`, or `None` if the change does not describe the view of the map, e.g., after resizing it.
+    """
+    if not relayout_data or "mapbox.zoom" not in relayout_data:
+        return None
+    corners = (relayout_data.get("mapbox._derived") or {}).get("coordinates")
+    bounds = None
+    if corners:
+        longs, lats = zip(*corners)
+        bounds = (min(longs), min(lats), max(longs), max(lats))
+    return bubble_viewport(relayout_data["mapbox.zoom"], bounds)
+
+
+def prewarm_figure_cache(dataset: RobDataset = None):
+    """
+    Caches the charts of the most commonly selected date ranges, i.e., the default date range, every calendar year,
+    and every season (`SEASONS`) of these years.
+
+    Parameters
+    ----------
+    dataset
+        snapshot of the data, defaults to the current snapshot.
+    """
+    dataset = dataset or get_dataset()
+    start_date, end_date = default_date_range(summarize_dataset(dataset))
+    years = range(start_date.year, end_date.year + 1)
+    date_ranges = [(str(start_date), str(end_date))]
+    date_ranges += [
+        ("{}-01-01".format(year), "{}-01-01".format(year + 1)) for year in years
+    ]
+    for year in years:
+        for first_month, n_months in SEASONS:
+            season_start = pd.Timestamp(year, first_month, 1)
+            season_end = season_start + pd.DateOffset(months=n_months)
+            date_ranges.append((str(season_start.date()), str(season_end.date())))
+    for start_date, end_date in date_ranges:
+        _serialize_figures(dataset, start_date, end_date)
+
+
+@app.callback(
+    Output("fig-part-to-whole", "figure"),
+    Output("fig-bubbles", "figure"),
+    Output("fig-time-series", "figure"),
+    Output("fig-length-of-stay", "figure"),
+    Input("date-picker", "start_date"),
+    Input("date-picker", "end_date"),
+    Input("fig-bubbles", "relayoutData"),
+    State("session-id", "data"),
+    # The charts of the default date range are part of the layout
+    prevent_initial_call=True,
+)
+@metrics.instrument_callback
+def update_figures(
+    start_date: str, end_date: str, relayout_data: dict = None, session_id: str = None
+) -> list:
+    """
+    Updates the donut chart, the bubble chart, the time-series chart, and the length-of-stay chart based on the
+    selected date range. The data is aggregated once for all charts, and the charts are built in parallel. The bubbles
+    are clustered depending on the view of the map, and only the bubble chart is updated if the user zooms or pans the
+    map.
+
+    Dragging through the date picker or zooming fires a burst of requests. A request is skipped without updating the
+    charts if a later request of the same browser session has arrived at this worker process before its charts are
+    built: a change of the date range supersedes all earlier requests, a change of the map view only earlier changes
+    of the map view.
+
+    Parameters
+    ----------
+    start_date
+        Start date of the considered time period.
+
+    end_date
+        End date of the considered time period.
+
+    relayout_data
+        last change of the view of the bubble map.
+
+    session_id
+        ID of the browser session, requests without ID are never skipped.
+
+    Returns
+    -------
+    A list of the charts in the order of `_CHARTS`.
+    """
+    dataset = get_dataset()
+    viewport = _bubble_viewport(relayout_data)
+    if relayout_data is not None and ctx.triggered_id == "fig-bubbles":
+        if viewport is None:
+            raise PreventUpdate
+        request_ticket = None
+        if session_id is not None:
+            request_ticket = (
+                session_id,
+                "bubbles",
+                _LATEST_REQUESTS.begin(session_id, ("bubbles",)),
+            )
+            _skip_if_superseded(request_ticket)
+        payload = _serialize_bubbles(dataset, start_date, end_date, viewport)
+        metrics.PAYLOAD_BYTES.observe(len(payload), "update_figures")
+        return [no_update, json.loads(payload), no_update, no_update]
+
+    request_ticket = None
+    if session_id is not None:
+        request_ticket = (
+            session_id,
+            "figures",
+            _LATEST_REQUESTS.begin(session_id, ("figures", "bubbles")),
+        )
+        _skip_if_superseded(request_ticket)
+    payload = _serialize_figures(dataset, start_date, end_date, request_ticket)
+    metrics.PAYLOAD_BYTES.observe(len(payload), "update_figures")
+    figures = json.loads(payload)
+    if viewport is not None and viewport != _INITIAL_BUBBLE_VIEWPORT:
+        figures[1] = json.loads(
+            _serialize_bubbles(dataset, start_date, end_date, viewport)
+        )
+    return figures
+
+
+@app.server.route("/cache-stats")
+def cache_stats():
+    """
+    Returns the hit and miss counters of the figure cache.
+    """
+    return jsonify(FIGURE_CACHE.stats())
+
+
+@app.server.route("/export/<name>.<file_format>")
+def export_data(name: str, file_format: str):
+    """
+    Streams the data behind a chart or the raw history of the animals (see `query_export`) as CSV or Parquet file in
+    chunks, e.g., `/export/history.parquet?start_date=2020-01-01&end_date=2021-01-01`. The time range defaults to the
+    one selected when the app is opened.
+
+    Parameters
+    ----------
+    name
+        "part-to-whole", "time-series", "bubbles", "length-of-stay", or "history".
+
+    file_format
+        "csv" or "parquet".
+
+    Returns
+    -------
+    A streamed response with the file.
+    """
+    if name not in EXPORTS or file_format not in export.FORMATS:
+        return Response(
+            f"There is no export '{name}.{file_format}'.",
+            status=404,
+            mimetype="text/plain",
+        )
+    if not is_dataset_loaded():
+        return Response(
+            "The data is being loaded.",
+            status=503,
+            headers={"Retry-After": "5"},
+            mimetype="text/plain",
+        )
+    dataset = get_dataset()
+    default_start, default_end = default_date_range(summarize_dataset(dataset))
+    start_date = request.args.get("start_date", str(default_start))
+    end_date = request.args.get("end_date", str(default_end))
+    try:
+        parts = query_export(name, start_date, end_date, dataset)
+    except ValueError as error:
+        return Response(str(error), status=400, mimetype="text/plain")
+    chunks = (export.iter_csv if file_format == "csv" else export.iter_parquet)(parts)
+    return Response(
+        chunks,
+        mimetype=export.FORMATS[file_format],
+        headers={
+            "Content-Disposition": 'attachment; filename="rob-{}_{}_{}.{}"'.format(
+                name, start_date, end_date, file_format
+            )
+        },
+    )
+
+
+@app.server.route("/metrics")
+def metrics_endpoint():
+    """
+    Returns the latency histograms of the callbacks, their stages, and the aggregations, the size of the callback
+    outputs, the counters of the figure cache, the counters of compressed and not modified responses, and the counters
+    of coalesced computations and superseded requests in the Prometheus text format. The metrics are collected per
+    worker process.
+    """
+    cache_stats = FIGURE_CACHE.stats()
+    return Response(
+        metrics.render(
+            counters={
+                "rob_figure_cache_hits_total": cache_stats["hits"],
+                "rob_figure_cache_misses_total": cache_stats["misses"],
+                **http_responses.counters(),
+                **coalescing.counters(),
+            },
+            gauges={
+                "rob_figure_cache_entries": cache_stats["entries"],
+                "rob_figure_cache_bytes": cache_stats["bytes"],
+            },
+        ),
+        mimetype="text/plain; version=0.0.4",
+    )
+
+
+# Cache the charts of the most commonly selected date ranges now and whenever the data has been refreshed
+threading.Thread(target=prewarm_figure_cache, name="rob-prewarm", daemon=True).start()
+add_refresh_listener(prewarm_figure_cache)
+
+
 if __name__ == "__main__":
     app.run_server(debug=True)
@@ -0,0 +1,127 @@
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+_COUNTERS = {
+    "rob_coalesced_computations_total": 0,
+    "rob_superseded_requests_total": 0,
+}
+_LOCK = threading.Lock()
+
+
+def _count(name: str):
+    with _LOCK:
+        _COUNTERS[name] += 1
+
+
+def counters() -> dict:
+    """
+    Returns the number of computations that waited for an identical computation in progress, and the number of
+    requests that were skipped, because a later request of the same session superseded them.
+    """
+    with _LOCK:
+        return dict(_COUNTERS)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key, so only the first call computes the result and all others wait for
+    it. Results are not kept after the call, which is what caches are for.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args):
+        """
+        Calls `function(*args)` unless a call with the same key is in progress, in which case its result is awaited.
+
+        Parameters
+        ----------
+        key
+            hashable key of the call, e.g., the version of the data and the selected date range.
+
+        function
+            function computing the result.
+
+        args
+            arguments of `function`.
+
+        Returns
+        -------
+        The result of the call, or the exception of the call is raised in all waiting callers.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._calls[key] = Future()
+        if not is_leader:
+            _count("rob_coalesced_computations_total")
+            return future.result()
+        try:
+            result = function(*args)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class LatestRequests:
+    """
+    Remembers the latest request of every client session per kind of request, e.g., updating all charts or only the
+    bubble map, so requests that have been superseded by a later request of the same session can be skipped. Requests
+    are numbered in the order of their arrival in the current process. The least recently active sessions are
+    forgotten beyond `max_sessions`.
+    """
+
+    def __init__(self, max_sessions: int = 10000):
+        self.max_sessions = max_sessions
+        self._sequence = itertools.count()
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, session_id: str, kinds: tuple) -> int:
+        """
+        Registers a request as the latest one of its session for all `kinds` it covers.
+
+        Parameters
+        ----------
+        session_id
+            ID of the client session.
+
+        kinds
+            kinds of requests that the request supersedes, e.g., a date change updates all charts including the bubble
+            map.
+
+        Returns
+        -------
+        The sequence number of the request.
+        """
+        with self._lock:
+            sequence_number = next(self._sequence)
+            latest = self._sessions.setdefault(session_id, {})
+            self._sessions.move_to_end(session_id)
+            for kind in kinds:
+                latest[kind] = sequence_number
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return sequence_number
+
+    def is_superseded(self, session_id: str, kind: str, sequence_number: int) -> bool:
+        """
+        Returns whether a later request of the same session has been registered for `kind`, and counts it if so.
+        """
+        with self._lock:
+            latest = self._sessions.get(session_id, {}).get(kind, sequence_number)
+        if latest > sequence_number:
+            _count("rob_superseded_requests_total")
+            return True
+        return False
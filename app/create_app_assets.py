@@ -1,70 +1,1731 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import compute as pa_compute
+from pyarrow import csv as pa_csv
 import boto3
+import coalescing
+import metrics
+import partitions
+import query_backends
+import shared_dataset
 import botocore
+import csv
+import functools
 import io
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import NamedTuple
 
 S3_BUCKET = "rob-oliver"
 KEY = "data/deployment/rob.csv"
 
+# Optional endpoint of an S3-compatible stand-in (e.g. a local MinIO or moto server) instead of AWS-S3
+S3_ENDPOINT_URL = os.environ.get("ROB_S3_ENDPOINT_URL")
+# Optional local directory mirroring the layout of the S3-bucket, i.e., the data is read from `<dir>/<KEY>`
+LOCAL_DATA_DIR = os.environ.get("ROB_LOCAL_DATA_DIR")
+# Directory of the local snapshot of the data, which survives restarts and is shared by all workers on a machine
+CACHE_DIR = os.environ.get(
+    "ROB_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+# If set to "1", the local snapshot is used without revalidating it against the data source
+OFFLINE = os.environ.get("ROB_OFFLINE", "0") == "1"
+# Optional directory in which the loaded and indexed data is published once and memory-mapped by all worker processes
+SHARED_DATASET_DIR = os.environ.get("ROB_SHARED_DATASET_DIR")
+# Interval in seconds in which the data is refreshed in the background, a value <= 0 disables refreshing
+REFRESH_INTERVAL = float(os.environ.get("ROB_REFRESH_INTERVAL", "3600"))
+# Time in seconds after which loading the data is retried if it has failed, e.g., because S3 is unreachable
+LOAD_RETRY_INTERVAL = float(os.environ.get("ROB_LOAD_RETRY_INTERVAL", "30"))
+# Maximal number of date ranges whose aggregations are memoized
+QUERY_CACHE_SIZE = int(os.environ.get("ROB_QUERY_CACHE_SIZE", "256"))
+# Maximal number of points per `Tierart` in the time series displayed in the app, see `create_adaptive_time_series`
+TIME_SERIES_MAX_POINTS = int(os.environ.get("ROB_TIME_SERIES_MAX_POINTS", "260"))
+# How long time series are reduced to `TIME_SERIES_MAX_POINTS`, i.e., "bins" or "lttb"
+TIME_SERIES_DOWNSAMPLING = os.environ.get("ROB_TIME_SERIES_DOWNSAMPLING", "bins")
+# Number of bytes of the CSV file that are parsed at once, see `_read_rob_csv`
+CSV_BLOCK_SIZE = int(os.environ.get("ROB_CSV_BLOCK_SIZE", str(2**22)))
+# Prefix of the year-partitioned layout (see `partitions.write_partitions`) in the S3-bucket or in `LOCAL_DATA_DIR`,
+# which is used instead of `KEY` if it exists; an empty value disables the partitioned layout
+PARTITIONS_PREFIX = os.environ.get("ROB_PARTITIONS_PREFIX", "data/deployment/rob/")
+# Maximal number of year partitions that are kept loaded and indexed, see `_datasets_for_range`
+PARTITION_CACHE_SIZE = int(os.environ.get("ROB_PARTITION_CACHE_SIZE", "64"))
+# Maximal number of snapshots or year partitions whose completed stays are kept, see `_build_stays`
+STAYS_CACHE_SIZE = int(os.environ.get("ROB_STAYS_CACHE_SIZE", "64"))
+# Zoom level of the bubble map from which every finding place is shown as a bubble of its own, see `bubble_viewport`
+BUBBLES_DETAIL_ZOOM = float(os.environ.get("ROB_BUBBLES_DETAIL_ZOOM", "9"))
+# Stays longer than this number of weeks are counted in its bin, see `create_length_of_stay`
+LENGTH_OF_STAY_MAX_WEEKS = int(os.environ.get("ROB_LENGTH_OF_STAY_MAX_WEEKS", "52"))
+# Engine computing the aggregations: "indexed" (default), "pandas", or "duckdb", see `set_query_backend`
+QUERY_BACKEND = os.environ.get("ROB_QUERY_BACKEND", "indexed")
 
-def _load_rob() -> pd.DataFrame:
+# Declared types of the columns of `rob.csv` except for `Sys_id` and the timestamps, see `_rob_column_types`. Text
+# columns with few distinct values are dictionary-encoded while parsing.
+_ROB_COLUMN_TYPES = {
+    "Fundort": pa.dictionary(pa.int32(), pa.string()),
+    "Lat": pa.float64(),
+    "Long": pa.float64(),
+    "Einlieferungsdatum": pa.timestamp("ns"),
+    "Tierart": pa.dictionary(pa.int32(), pa.string()),
+    "Aktuell": pa.dictionary(pa.int32(), pa.string()),
+    "Sys_hash": pa.string(),
+}
+_ROB_TIMESTAMP_COLUMNS = ("Erstellt_am", "Sys_aktualisiert_am")
+# Text columns with many distinct values are kept in Arrow memory instead of one Python string per row
+_ARROW_STRING = pd.StringDtype("pyarrow")
+_UTC_OFFSET = re.compile(r"(Z|[+-]\d{2}:?\d{2})$")
+_INTEGER = re.compile(r"[+-]?\d+")
+
+
+class _RawStream(io.RawIOBase):
+    """
+    Adapts a stream that only provides `read`, e.g., the body of an S3-object, to `io.RawIOBase`, so it can be
+    buffered.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def _rob_column_types(head: bytes) -> dict:
+    """
+    Declares the types of the columns of `rob.csv`. `Sys_id` is an integer if the first row has a numeric `Sys_id`,
+    and dictionary-encoded text otherwise. The timestamps are read as text if the first row has UTC offsets, since
+    Arrow would convert them to UTC instead of keeping their wall time, see `_read_rob_csv`.
+
+    Parameters
+    ----------
+    head
+        first bytes of the CSV file, including the header and the first row.
+
+    Returns
+    -------
+    A dictionary of Arrow types by column.
+    """
+    lines = head.split(b"\n")[:3]
+    sys_id_type = pa.dictionary(pa.int32(), pa.string())
+    timestamp_type = pa.timestamp("ns")
+    if len(lines) == 3:
+        rows = list(csv.DictReader(line.decode("utf-8") for line in lines[:2]))
+        if rows and _INTEGER.fullmatch((rows[0].get("Sys_id") or "").strip()):
+            sys_id_type = pa.int64()
+        if rows and _UTC_OFFSET.search((rows[0].get("Erstellt_am") or "").strip()):
+            timestamp_type = pa.string()
+    return dict(
+        _ROB_COLUMN_TYPES,
+        Sys_id=sys_id_type,
+        **{column: timestamp_type for column in _ROB_TIMESTAMP_COLUMNS},
+    )
+
+
+@metrics.instrument()
+def _read_rob_csv(stream) -> pd.DataFrame:
+    """
+    Parses the CSV file with information about seals admitted to the Seehundstation Friedrichskoog while it is read.
+    The file is parsed in blocks of `CSV_BLOCK_SIZE` bytes into Arrow with declared column types and ISO-8601
+    timestamps. The whole Arrow table is built before it is converted to pandas, so the peak memory is about three
+    times the memory of the resulting `DataFrame`, e.g., 443 MiB for 1M rows taking 164 MiB. `Sys_hash` stays in Arrow
+    memory (see `_ARROW_STRING`) instead of being copied to one Python string per row.
+
+    Parameters
+    ----------
+    stream
+        binary file-like object of the CSV file, e.g., the body of the S3-object.
+
+    Returns
+    -------
+    A `pandas DataFrame` with typed columns and categoricals for the dictionary-encoded columns.
+    """
+    buffered = io.BufferedReader(
+        stream if isinstance(stream, io.RawIOBase) else _RawStream(stream),
+        buffer_size=2**16,
+    )
+    reader = pa_csv.open_csv(
+        buffered,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=_rob_column_types(buffered.peek(2**16)),
+            timestamp_parsers=[pa_csv.ISO8601],
+            strings_can_be_null=True,
+        ),
+    )
+    table = reader.read_all()
+    for column in _ROB_TIMESTAMP_COLUMNS:
+        index = table.schema.get_field_index(column)
+        if pa.types.is_string(table.schema.field(index).type):
+            # The UTC offsets are dropped, so the timestamps keep their wall time like in `_read_rob_csv_with_pandas`
+            table = table.set_column(
+                index,
+                column,
+                pa_compute.cast(
+                    pa_compute.replace_substring_regex(
+                        table[column], pattern=_UTC_OFFSET.pattern, replacement=""
+                    ),
+                    pa.timestamp("ns"),
+                ),
+            )
+    # The Arrow buffers are released while they are converted, except for the text of `Sys_hash`, which is kept.
+    # Converting in a single thread is as fast, but needs less memory.
+    df_rob = table.to_pandas(
+        split_blocks=True,
+        self_destruct=True,
+        use_threads=False,
+        types_mapper={pa.string(): _ARROW_STRING}.get,
+    )
+    del table
+    return df_rob
+
+
+def _read_rob_csv_with_pandas(buffer) -> pd.DataFrame:
+    """
+    Parses the CSV file with information about seals admitted to the Seehundstation Friedrichskoog with type
+    inference. This is the fallback of `_read_rob_csv` for data in unexpected formats.
+
+    Parameters
+    ----------
+    buffer
+        path or file-like object of the CSV file.
+
+    Returns
+    -------
+    A `pandas DataFrame` with typed columns.
+    """
+    df_rob = pd.read_csv(buffer)
+    df_rob = df_rob.astype(
+        {
+            "Long": "float64",
+            "Lat": "float64",
+            "Einlieferungsdatum": "datetime64[ns]",
+        }
+    )
+    # Timestamps keep their wall time, also if their UTC offsets differ, e.g., between summer and winter time
+    df_rob = df_rob.assign(
+        **{
+            column: pd.to_datetime(
+                df_rob[column]
+                .astype("string")
+                .str.replace(_UTC_OFFSET.pattern, "", regex=True)
+            )
+            for column in _ROB_TIMESTAMP_COLUMNS
+        }
+    )
+    return df_rob
+
+
+def _to_category(series: pd.Series) -> pd.Series:
+    """
+    Converts a column to a categorical with sorted categories, also if it is categorical already, e.g., after parsing.
+    """
+    categorical = series.astype("category")
+    return categorical.cat.reorder_categories(categorical.cat.categories.sort_values())
+
+
+def _compact_rob(df_rob: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the data to a compact representation: categoricals for the text columns with few distinct values, Arrow
+    strings for `Sys_hash`, and the narrowest integer type for numeric `Sys_id`s (categoricals otherwise). The
+    coordinates keep double precision, since they are displayed and exported per finding place, and single precision
+    would show them with spurious digits, e.g., 8.333459854125977 instead of 8.33346.
+
+    Parameters
+    ----------
+    df_rob
+        data about seals admitted to the Seehundstation Friedrichskoog.
+
+    Returns
+    -------
+    A `pandas DataFrame` with the same data in a compact representation.
+    """
+    if pd.api.types.is_integer_dtype(df_rob["Sys_id"]):
+        sys_ids = pd.to_numeric(df_rob["Sys_id"], downcast="integer")
+    else:
+        # Categoricals store their codes in the narrowest integer type
+        sys_ids = _to_category(df_rob["Sys_id"])
+    return df_rob.assign(
+        Sys_id=sys_ids,
+        Fundort=_to_category(df_rob["Fundort"]),
+        Tierart=_to_category(df_rob["Tierart"]),
+        Aktuell=_to_category(df_rob["Aktuell"]),
+        Long=df_rob["Long"].astype("float64"),
+        Lat=df_rob["Lat"].astype("float64"),
+        Sys_hash=df_rob["Sys_hash"].astype(_ARROW_STRING),
+    )
+
+
+def memory_report(
+    df_before: pd.DataFrame, df_after: pd.DataFrame = None
+) -> pd.DataFrame:
+    """
+    Reports the memory usage of the data per column before and after converting it to a compact representation.
+
+    Parameters
+    ----------
+    df_before
+        data in its original representation.
+
+    df_after
+        data in its compact representation, defaults to `df_before` converted by `_compact_rob`.
+
+    Returns
+    -------
+    A `pandas DataFrame` with the bytes per column before and after the conversion, and their ratio. The last row
+    contains the totals.
+    """
+    if df_after is None:
+        df_after = _compact_rob(df_before)
+    df_report = pd.DataFrame(
+        {
+            "dtype_before": df_before.dtypes.astype(str),
+            "dtype_after": df_after.dtypes.astype(str),
+            "bytes_before": df_before.memory_usage(index=False, deep=True),
+            "bytes_after": df_after.memory_usage(index=False, deep=True),
+        }
+    )
+    df_report.loc["Total", ["bytes_before", "bytes_after"]] = df_report[
+        ["bytes_before", "bytes_after"]
+    ].sum()
+    df_report = df_report.astype({"bytes_before": "int64", "bytes_after": "int64"})
+    return df_report.assign(ratio=df_report["bytes_after"] / df_report["bytes_before"])
+
+
+def _snapshot_paths() -> tuple:
+    """
+    Returns the paths of the local snapshot of the data and of its metadata file.
+    """
+    name = KEY.replace("/", "_").rsplit(".", 1)[0]
+    return (
+        os.path.join(CACHE_DIR, name + ".parquet"),
+        os.path.join(CACHE_DIR, name + ".json"),
+    )
+
+
+def _read_snapshot(validator: str = None):
+    """
+    Reads the local snapshot of the data.
+
+    Parameters
+    ----------
+    validator
+        ETag (or modification stamp) of the data source the snapshot must have been taken from. If `None`, any snapshot
+        is accepted.
+
+    Returns
+    -------
+    A `pandas DataFrame` if a matching snapshot exists, otherwise `None`.
+    """
+    snapshot_path, meta_path = _snapshot_paths()
+    try:
+        with open(meta_path) as meta_file:
+            meta = json.load(meta_file)
+        if validator is not None and meta.get("validator") != validator:
+            return None
+        return pd.read_parquet(snapshot_path)
+    except (OSError, ValueError):
+        # A missing or corrupt snapshot is treated like a cache miss
+        return None
+
+
+def _write_snapshot(df_rob: pd.DataFrame, validator: str, last_modified: str = None):
+    """
+    Writes the local snapshot of the data. Files are replaced atomically, so concurrently starting workers never read
+    a partially written snapshot.
+
+    Parameters
+    ----------
+    df_rob
+        data to be stored.
+
+    validator
+        ETag (or modification stamp) of the data source the data was read from.
+
+    last_modified
+        last modification date of the data source.
+    """
+    snapshot_path, meta_path = _snapshot_paths()
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        suffix = ".{}.tmp".format(os.getpid())
+        df_rob.to_parquet(snapshot_path + suffix, index=False)
+        with open(meta_path + suffix, "w") as meta_file:
+            json.dump(
+                {"validator": validator, "last_modified": last_modified, "key": KEY},
+                meta_file,
+            )
+        # The metadata is replaced last, so it never points to an older snapshot than the one on disk
+        os.replace(snapshot_path + suffix, snapshot_path)
+        os.replace(meta_path + suffix, meta_path)
+    except OSError as error:
+        print(f"The local snapshot of the data could not be written to '{CACHE_DIR}'.")
+        print(error)
+
+
+def _read_snapshot_validator():
+    """
+    Returns the ETag (or modification stamp) of the data source the local snapshot was taken from, or `None` if there
+    is no local snapshot.
+    """
+    snapshot_path, meta_path = _snapshot_paths()
+    try:
+        if not os.path.exists(snapshot_path):
+            return None
+        with open(meta_path) as meta_file:
+            return json.load(meta_file).get("validator")
+    except (OSError, ValueError):
+        return None
+
+
+def _s3_client():
+    """
+    Creates a client of the S3-bucket (or of its stand-in at `S3_ENDPOINT_URL`).
+    """
+    # The S3-bucket grants read rights to the public, so we do not need to provide credentials
+    config = botocore.client.Config(signature_version=botocore.UNSIGNED)
+    return boto3.client("s3", config=config, endpoint_url=S3_ENDPOINT_URL)
+
+
+def _fetch_rob(validator: str = None) -> tuple:
+    """
+    Fetches the data from its source, i.e., the S3-bucket or the local directory `LOCAL_DATA_DIR`, unless the data
+    source has not changed.
+
+    Parameters
+    ----------
+    validator
+        ETag (or modification stamp) of the data at hand. If the data source still matches it, nothing is downloaded.
+
+    Returns
+    -------
+    A tuple of a `pandas DataFrame` (or `None` if the data source has not changed), the ETag (or modification stamp)
+    of the data source, and its last modification date.
+    """
+    if LOCAL_DATA_DIR:
+        path = os.path.join(LOCAL_DATA_DIR, *KEY.split("/"))
+        stat = os.stat(path)
+        last_modified = pd.Timestamp(stat.st_mtime, unit="s").isoformat()
+        source_validator = "{}-{}".format(stat.st_mtime_ns, stat.st_size)
+        if source_validator == validator:
+            return None, validator, last_modified
+        try:
+            with open(path, "rb", buffering=0) as stream:
+                df_rob = _read_rob_csv(stream)
+        except pa.ArrowInvalid as error:
+            print(
+                "The data is in an unexpected format and is parsed with type inference."
+            )
+            print(error)
+            df_rob = _read_rob_csv_with_pandas(path)
+        return df_rob, source_validator, last_modified
+
+    try:
+        s3 = _s3_client()
+        if validator is None:
+            rob_obj = s3.get_object(Bucket=S3_BUCKET, Key=KEY)
+        else:
+            rob_obj = s3.get_object(Bucket=S3_BUCKET, Key=KEY, IfNoneMatch=validator)
+        try:
+            df_rob = _read_rob_csv(rob_obj["Body"])
+        except pa.ArrowInvalid as error:
+            print(
+                "The data is in an unexpected format and is parsed with type inference."
+            )
+            print(error)
+            # The body has been consumed, so the object is downloaded again
+            rob_obj = s3.get_object(Bucket=S3_BUCKET, Key=KEY)
+            df_rob = _read_rob_csv_with_pandas(io.BytesIO(rob_obj["Body"].read()))
+    except botocore.exceptions.ClientError as error:
+        if error.response["Error"]["Code"] in ("304", "NotModified"):
+            # The object has not changed since `validator` was issued
+            return None, validator, None
+        if error.response["Error"]["Code"] == "NoSuchKey":
+            print(
+                f"The key '{KEY}' you are trying to access in AWS-S3-bucket {S3_BUCKET} does not exist."
+            )
+        elif error.response["Error"]["Code"] == "AccessDenied":
+            print(
+                f"The access to key '{KEY}' in AWS-S3-bucket {S3_BUCKET} is denied. It could be that the key does not"
+                f" exist."
+            )
+        else:
+            print("An unexpected exception has occurred.")
+            print(error)
+        raise
+    except botocore.exceptions.BotoCoreError:
+        # E.g., the S3-bucket cannot be reached, which is handled by the caller
+        raise
+    except:
+        print("An unexpected exception has occurred.")
+        raise
+    else:
+        last_modified = (
+            rob_obj["LastModified"].isoformat() if "LastModified" in rob_obj else None
+        )
+        return df_rob, rob_obj["ETag"], last_modified
+
+
+def _load_rob() -> tuple:
     """
     Loads the data to be displayed in the app.
 
+    The data is revalidated against the S3-bucket with a conditional request. If the object has not changed since the
+    last download, the local snapshot is loaded instead of downloading and parsing the CSV file again. If the S3-bucket
+    cannot be reached, the local snapshot is used as a fallback.
+
+    Returns
+    -------
+    A tuple of a `pandas DataFrame` containing information about seals admitted to the Seehundstation Friedrichskoog
+    and the ETag (or modification stamp) of its data source.
+    """
+    validator = _read_snapshot_validator()
+    if OFFLINE:
+        df_rob = _read_snapshot()
+        if df_rob is None:
+            raise FileNotFoundError(
+                f"There is no local snapshot of the data in '{CACHE_DIR}' to be used in offline mode."
+            )
+        return df_rob, validator
+
+    try:
+        df_rob, validator, last_modified = _fetch_rob(validator)
+    except botocore.exceptions.BotoCoreError as error:
+        df_rob = _read_snapshot()
+        if df_rob is None:
+            print("An unexpected exception has occurred.")
+            print(error)
+            raise
+        print(
+            f"The AWS-S3-bucket {S3_BUCKET} cannot be reached. The local snapshot in '{CACHE_DIR}' is used instead."
+        )
+        return df_rob, validator
+
+    if df_rob is None:
+        df_rob = _read_snapshot(validator)
+        if df_rob is not None:
+            return df_rob, validator
+        # The snapshot has vanished in the meantime, so the data is downloaded unconditionally
+        df_rob, validator, last_modified = _fetch_rob()
+    _write_snapshot(df_rob, validator, last_modified)
+    return df_rob, validator
+
+
+def _partition_path(name: str) -> str:
+    """
+    Returns the key of a file of the partitioned layout in the S3-bucket, or its path in `LOCAL_DATA_DIR`.
+    """
+    key = PARTITIONS_PREFIX + name
+    return os.path.join(LOCAL_DATA_DIR, *key.split("/")) if LOCAL_DATA_DIR else key
+
+
+def _fetch_manifest(validator: str = None) -> tuple:
+    """
+    Fetches the manifest of the partitioned layout under `PARTITIONS_PREFIX` unless it has not changed.
+
+    Parameters
+    ----------
+    validator
+        ETag (or modification stamp) of the manifest at hand. If the manifest still matches it, nothing is downloaded.
+
+    Returns
+    -------
+    A tuple of the `partitions.Partition`s (or `None` if the manifest has not changed) and the ETag (or modification
+    stamp) of the manifest. Raises a `FileNotFoundError` if there is no partitioned layout.
+    """
+    path = _partition_path(partitions.MANIFEST)
+    if LOCAL_DATA_DIR:
+        stat = os.stat(path)
+        source_validator = "{}-{}".format(stat.st_mtime_ns, stat.st_size)
+        if source_validator == validator:
+            return None, validator
+        with open(path, "rb") as manifest_file:
+            return partitions.parse_manifest(manifest_file.read()), source_validator
+
+    try:
+        s3 = _s3_client()
+        if validator is None:
+            manifest_obj = s3.get_object(Bucket=S3_BUCKET, Key=path)
+        else:
+            manifest_obj = s3.get_object(
+                Bucket=S3_BUCKET, Key=path, IfNoneMatch=validator
+            )
+    except botocore.exceptions.ClientError as error:
+        if error.response["Error"]["Code"] in ("304", "NotModified"):
+            return None, validator
+        if error.response["Error"]["Code"] in (
+            "NoSuchKey",
+            "AccessDenied",
+            "403",
+            "404",
+        ):
+            raise FileNotFoundError(
+                f"There is no partitioned layout under '{PARTITIONS_PREFIX}' in AWS-S3-bucket {S3_BUCKET}."
+            ) from error
+        raise
+    return partitions.parse_manifest(manifest_obj["Body"].read()), manifest_obj["ETag"]
+
+
+def _read_partition(partition: partitions.Partition) -> pd.DataFrame:
+    """
+    Reads the data of one partition, see `_load_partition`.
+    """
+    path = _partition_path(partition.file)
+    if LOCAL_DATA_DIR:
+        return pd.read_parquet(path)
+    partition_obj = _s3_client().get_object(Bucket=S3_BUCKET, Key=path)
+    return pd.read_parquet(io.BytesIO(partition_obj["Body"].read()))
+
+
+# Upper bound of the validity of the latest status of an animal
+_END_OF_TIME = np.datetime64(np.iinfo(np.int64).max, "ns")
+
+
+class StatusIntervals(NamedTuple):
+    """
+    Validity intervals [valid_from, valid_to) of the statuses (`Aktuell`) of all animals, derived from the `Erstellt_am`
+    history and sorted by `Einlieferungsdatum`. The `Einlieferungsdatum` of an animal is assumed to be the same in all
+    versions of its history.
+    """
+
+    admission: np.ndarray
+    valid_from: np.ndarray
+    valid_to: np.ndarray
+    status: np.ndarray
+    labels: np.ndarray
+
+
+def _build_status_intervals(df_rob: pd.DataFrame) -> StatusIntervals:
+    """
+    Derives the validity intervals of the statuses of all animals. The status recorded at `Erstellt_am` is valid until
+    the next later `Erstellt_am` of the same animal.
+
+    Parameters
+    ----------
+    df_rob
+        data about seals admitted to the Seehundstation Friedrichskoog.
+
+    Returns
+    -------
+    A `StatusIntervals` sorted by `Einlieferungsdatum`.
+    """
+    df_history = df_rob[
+        ["Sys_id", "Erstellt_am", "Einlieferungsdatum", "Aktuell"]
+    ].dropna(subset=["Sys_id", "Erstellt_am", "Einlieferungsdatum"])
+    df_history = df_history.sort_values(by=["Sys_id", "Erstellt_am"], kind="mergesort")
+    sys_ids = pd.factorize(df_history["Sys_id"])[0]
+    valid_from = df_history["Erstellt_am"].to_numpy(dtype="datetime64[ns]")
+
+    # Rows of the same animal with the same `Erstellt_am` share one interval that ends at the next later `Erstellt_am`
+    is_new_key = np.ones(len(df_history), dtype=bool)
+    is_new_key[1:] = (sys_ids[1:] != sys_ids[:-1]) | (valid_from[1:] != valid_from[:-1])
+    key_ids = np.cumsum(is_new_key) - 1
+    key_sys_ids = sys_ids[is_new_key]
+    key_valid_from = valid_from[is_new_key]
+    key_valid_to = np.full(key_valid_from.size, _END_OF_TIME)
+    has_successor = key_sys_ids[1:] == key_sys_ids[:-1]
+    key_valid_to[:-1][has_successor] = key_valid_from[1:][has_successor]
+    valid_to = key_valid_to[key_ids]
+
+    status, labels = pd.factorize(df_history["Aktuell"])
+    admission = df_history["Einlieferungsdatum"].to_numpy(dtype="datetime64[ns]")
+    order = np.argsort(admission, kind="stable")
+    # Rows without status never count, but they still end the interval of the preceding status above
+    order = order[status[order] >= 0]
+    return StatusIntervals(
+        admission=admission[order],
+        valid_from=valid_from[order],
+        valid_to=valid_to[order],
+        status=status[order],
+        labels=np.asarray(labels, dtype=object),
+    )
+
+
+class WeeklyCube(NamedTuple):
+    """
+    Dense weekly counts of admitted seals per `Tierart`. Weeks end on Mondays and are labeled by their last day, like
+    the `W-MON` frequency of pandas.
+    """
+
+    weeks: np.ndarray
+    tierarten: pd.Index
+    counts: np.ndarray
+    cumulative: np.ndarray
+    ranks: np.ndarray
+
+
+def _to_week_end(dates: np.ndarray) -> np.ndarray:
+    """
+    Maps dates to the Monday that ends their week.
+    """
+    days = dates.astype("datetime64[D]")
+    # 1970-01-01 was a Thursday, i.e., day 0 has weekday 3 with Monday being weekday 0
+    weekdays = (days.view("int64") + 3) % 7
+    return (days + (7 - weekdays) % 7).astype("datetime64[ns]")
+
+
+def _build_weekly_cube(df_rob: pd.DataFrame) -> WeeklyCube:
+    """
+    Counts the admitted seals per `Tierart` and week.
+
+    Parameters
+    ----------
+    df_rob
+        data about seals admitted to the Seehundstation Friedrichskoog.
+
+    Returns
+    -------
+    A `WeeklyCube` with one row per `Tierart` and one column per week between the first and the last admission.
+    """
+    df_admissions = (
+        df_rob[["Sys_id", "Einlieferungsdatum", "Tierart"]].drop_duplicates().dropna()
+    )
+    week_ends = _to_week_end(
+        df_admissions["Einlieferungsdatum"].to_numpy(dtype="datetime64[ns]")
+    )
+    tierart_codes, tierarten = pd.factorize(df_admissions["Tierart"], sort=True)
+    # Plain labels, because unobserved categories would break grouping the sliced time series, e.g., in plotly express
+    tierarten = pd.Index(np.asarray(tierarten, dtype=object), name="Tierart")
+    if week_ends.size == 0:
+        weeks = np.array([], dtype="datetime64[ns]")
+    else:
+        weeks = np.arange(
+            week_ends.min(),
+            week_ends.max() + np.timedelta64(7, "D"),
+            np.timedelta64(7, "D"),
+        )
+    week_codes = np.searchsorted(weeks, week_ends)
+    counts = np.bincount(
+        tierart_codes * weeks.size + week_codes, minlength=tierarten.size * weeks.size
+    ).reshape(tierarten.size, weeks.size)
+    return _to_weekly_cube(weeks, tierarten, counts)
+
+
+def _merge_weekly_cubes(weekly_cubes: list) -> WeeklyCube:
+    """
+    Adds up the weekly cubes of several partitions.
+
+    Parameters
+    ----------
+    weekly_cubes
+        list of `WeeklyCube`s.
+
     Returns
     -------
-    A `pandas DataFrame` containing information about seals admitted to the Seehundstation Friedrichskoog
+    A `WeeklyCube` with one row per `Tierart` of any of the cubes and one column per week between their first and their
+    last week.
+    """
+    tierarten = pd.Index(
+        sorted(set().union(*(weekly_cube.tierarten for weekly_cube in weekly_cubes))),
+        dtype=object,
+        name="Tierart",
+    )
+    weekly_cubes = [
+        weekly_cube for weekly_cube in weekly_cubes if weekly_cube.weeks.size > 0
+    ]
+    if not weekly_cubes:
+        weeks = np.array([], dtype="datetime64[ns]")
+    else:
+        weeks = np.arange(
+            min(weekly_cube.weeks[0] for weekly_cube in weekly_cubes),
+            max(weekly_cube.weeks[-1] for weekly_cube in weekly_cubes)
+            + np.timedelta64(7, "D"),
+            np.timedelta64(7, "D"),
+        )
+    counts = np.zeros((tierarten.size, weeks.size), dtype=np.int64)
+    for weekly_cube in weekly_cubes:
+        counts[
+            np.ix_(
+                tierarten.get_indexer(weekly_cube.tierarten),
+                np.searchsorted(weeks, weekly_cube.weeks),
+            )
+        ] += weekly_cube.counts
+    return _to_weekly_cube(weeks, tierarten, counts)
+
+
+def _to_weekly_cube(
+    weeks: np.ndarray, tierarten: pd.Index, counts: np.ndarray
+) -> WeeklyCube:
+    """
+    Completes the weekly counts per `Tierart` and week to a `WeeklyCube`.
+    """
+    cumulative = np.zeros((tierarten.size, weeks.size + 1), dtype=np.int64)
+    np.cumsum(counts, axis=1, out=cumulative[:, 1:])
+    # Row labels of the non-empty weeks in the (sparse) table of weekly counts sorted by `Tierart` and week
+    ranks = (np.cumsum(counts > 0) - 1).reshape(counts.shape)
+    return WeeklyCube(
+        weeks=weeks,
+        tierarten=tierarten,
+        counts=counts,
+        cumulative=cumulative,
+        ranks=ranks,
+    )
+
+
+# Number of levels of the pyramid of finding places, see `_build_location_index`
+_BUBBLE_LEVELS = 20
+
+
+def _to_tiles(long: np.ndarray, lat: np.ndarray, level: int) -> tuple:
+    """
+    Projects coordinates to the Web-Mercator grid of the map with 2**level x 2**level cells, whose rows count from the
+    north.
+    """
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -85.0511, 85.0511))
+    x = (np.asarray(long, dtype=np.float64) + 180) / 360
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2
+    return x * 2**level, y * 2**level
+
+
+def _to_cells(long: np.ndarray, lat: np.ndarray, level: int) -> np.ndarray:
+    """
+    Encodes the cells of the Web-Mercator grid of `level` containing the coordinates as `row * 2**level + column`.
+    """
+    x, y = _to_tiles(long, lat, level)
+    last = 2**level - 1
+    columns = np.clip(np.floor(x), 0, last).astype(np.int64)
+    rows = np.clip(np.floor(y), 0, last).astype(np.int64)
+    return rows * 2**level + columns
+
+
+class LocationIndex(NamedTuple):
+    """
+    Distinct combinations of animal and finding place sorted by `Einlieferungsdatum`, with the finding places encoded as
+    integer codes into `locations`. `cells` is a pyramid of the finding places, i.e., the cells of the Web-Mercator grid
+    containing them on every level (see `_to_cells`), with one row per level.
+    """
+
+    admission: np.ndarray
+    sys_ids: np.ndarray
+    location_codes: np.ndarray
+    locations: pd.DataFrame
+    has_repeats: bool
+    cells: np.ndarray
+
+
+def _build_location_index(df_rob: pd.DataFrame) -> LocationIndex:
+    """
+    Indexes the finding places of the admitted seals by `Einlieferungsdatum`.
+
+    Parameters
+    ----------
+    df_rob
+        data about seals admitted to the Seehundstation Friedrichskoog.
+
+    Returns
+    -------
+    A `LocationIndex` sorted by `Einlieferungsdatum`.
+    """
+    df_findings = (
+        df_rob[["Sys_id", "Einlieferungsdatum", "Fundort", "Long", "Lat"]]
+        .drop_duplicates()
+        .dropna()
+    )
+    df_findings = df_findings.sort_values(by="Einlieferungsdatum", kind="mergesort")
+    # Codes are assigned in the order of the sorted finding places
+    fundort_codes, fundorte = pd.factorize(df_findings["Fundort"], sort=True)
+    grouped = pd.DataFrame(
+        {
+            "Fundort": fundort_codes,
+            "Long": df_findings["Long"].to_numpy(),
+            "Lat": df_findings["Lat"].to_numpy(),
+        }
+    ).groupby(["Fundort", "Long", "Lat"], sort=True)
+    location_codes = grouped.ngroup().to_numpy(dtype=np.int64)
+    locations = grouped.size().index.to_frame(index=False)
+    locations["Fundort"] = fundorte.take(locations["Fundort"].to_numpy())
+    sys_ids = pd.factorize(df_findings["Sys_id"])[0]
+    # An animal counts once per finding place, even if it has been admitted there more than once
+    has_repeats = (
+        np.unique(sys_ids * max(len(locations), 1) + location_codes).size
+        < location_codes.size
+    )
+    cells = np.zeros((_BUBBLE_LEVELS, len(locations)), dtype=np.int64)
+    for level in range(_BUBBLE_LEVELS):
+        cells[level] = _to_cells(locations["Long"], locations["Lat"], level)
+    return LocationIndex(
+        admission=df_findings["Einlieferungsdatum"].to_numpy(dtype="datetime64[ns]"),
+        sys_ids=sys_ids,
+        location_codes=location_codes,
+        locations=locations,
+        has_repeats=has_repeats,
+        cells=cells,
+    )
+
+
+class RobDataset(NamedTuple):
+    """
+    Immutable snapshot of the data and everything derived from it. Whenever the data is refreshed, a new snapshot is
+    built and swapped in as a whole, so readers never see a partially updated state. Readers must therefore fetch the
+    snapshot once via `get_dataset` and must not modify it.
+    """
+
+    df: pd.DataFrame
+    version: str
+    status_intervals: StatusIntervals
+    weekly_cube: WeeklyCube
+    location_index: LocationIndex
+
+
+def _build_dataset(df_rob: pd.DataFrame, version: str) -> RobDataset:
+    """
+    Builds an immutable snapshot of the data.
+
+    Parameters
+    ----------
+    df_rob
+        data about seals admitted to the Seehundstation Friedrichskoog.
+
+    version
+        ETag (or modification stamp) of the data source.
+
+    Returns
+    -------
+    A `RobDataset` with the data in a compact representation (see `_compact_rob`) and everything derived from it.
+    """
+    df_rob = _compact_rob(df_rob)
+    return RobDataset(
+        df=df_rob,
+        version=version,
+        status_intervals=_build_status_intervals(df_rob),
+        weekly_cube=_build_weekly_cube(df_rob),
+        location_index=_build_location_index(df_rob),
+    )
+
+
+def _to_datetime64(date: datetime) -> np.datetime64:
+    """
+    Converts a date to the resolution of the indexes.
+    """
+    return np.datetime64(pd.Timestamp(date), "ns")
+
+
+def _memoize_by_version(maxsize: int = 128):
+    """
+    Decorator that memoizes `function(dataset, *args)` in a bounded LRU cache keyed by the version of the dataset and
+    the remaining arguments. Results of outdated versions are evicted like any other least recently used result.
+    Concurrent calls with the same key are computed once, see `coalescing.SingleFlight`. Cached results are shared
+    between callers and must not be modified.
+
+    Parameters
+    ----------
+    maxsize
+        maximal number of cached results.
+
+    Returns
+    -------
+    The decorator.
+    """
+
+    def decorator(function):
+        cache = OrderedDict()
+        lock = threading.Lock()
+        flights = coalescing.SingleFlight()
+
+        @functools.wraps(function)
+        def wrapper(dataset, *args):
+            key = (dataset.version,) + args
+            with lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    return cache[key]
+            result = flights.do(key, function, dataset, *args)
+            with lock:
+                cache[key] = result
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+class PartitionedRobDataset(NamedTuple):
+    """
+    Catalog of the data in the year-partitioned layout. The partitions are only loaded when a date range needs them,
+    see `_datasets_for_range`.
+    """
+
+    version: str
+    partitions: tuple
+
+
+class DatasetSummary(NamedTuple):
+    """
+    Statistics of the whole data, which are known without loading all partitions.
+    """
+
+    rows: int
+    first_admission: pd.Timestamp
+    last_created: pd.Timestamp
+    last_updated: pd.Timestamp
+
+
+def summarize_dataset(dataset=None) -> DatasetSummary:
+    """
+    Summarizes the data, e.g., for the banner of the app.
+
+    Parameters
+    ----------
+    dataset
+        `RobDataset` or `PartitionedRobDataset`, defaults to the current snapshot.
+
+    Returns
+    -------
+    A `DatasetSummary`.
+    """
+    dataset = dataset or get_dataset()
+    if isinstance(dataset, PartitionedRobDataset):
+        return DatasetSummary(
+            rows=sum(partition.rows for partition in dataset.partitions),
+            first_admission=min(
+                pd.Timestamp(partition.first_admission)
+                for partition in dataset.partitions
+            ),
+            last_created=max(
+                pd.Timestamp(partition.last_created) for partition in dataset.partitions
+            ),
+            last_updated=max(
+                pd.Timestamp(partition.last_updated) for partition in dataset.partitions
+            ),
+        )
+    return DatasetSummary(
+        rows=len(dataset.df),
+        first_admission=dataset.df["Einlieferungsdatum"].min(),
+        last_created=dataset.df["Erstellt_am"].max(),
+        last_updated=dataset.df["Sys_aktualisiert_am"].max(),
+    )
+
+
+def _datasets_for_range(
+    dataset, max_date: np.datetime64, min_date: np.datetime64
+) -> tuple:
+    """
+    Returns the snapshots of the data needed for the time range [min_date, max_date). Of a `PartitionedRobDataset`, only
+    the partitions that can contain animals within the time range are loaded, i.e., the years from six days before
+    `min_date` (the weeks of the time series end up to six days after their admissions) until `max_date`. The
+    `Erstellt_am` of an animal is assumed to never precede its `Einlieferungsdatum`.
+
+    Parameters
+    ----------
+    dataset
+        `RobDataset` or `PartitionedRobDataset`.
+
+    max_date
+        maximal date.
+
+    min_date
+        minimal date.
+
+    Returns
+    -------
+    A tuple of the `RobDataset`s of the partitions, or of `dataset` itself unless it is partitioned.
+    """
+    if not isinstance(dataset, PartitionedRobDataset):
+        return (dataset,)
+    years = [partition.year for partition in dataset.partitions]
+    first_year = (pd.Timestamp(min_date) - pd.Timedelta(days=6)).year
+    last_year = (pd.Timestamp(max_date) - pd.Timedelta(1, "ns")).year
+    # At least one partition is loaded, so empty time ranges still have the columns and categories of the data
+    first_year = min(max(first_year, years[0]), years[-1])
+    last_year = min(max(last_year, first_year), years[-1])
+    return tuple(
+        _PARTITION_FLIGHTS.do(partition, _load_partition, partition)
+        for partition in dataset.partitions
+        if first_year <= partition.year <= last_year
+    )
+
+
+@functools.lru_cache(maxsize=PARTITION_CACHE_SIZE)
+def _load_partition(partition: partitions.Partition) -> RobDataset:
+    """
+    Loads and indexes one partition. Partitions are cached by their checksum, so partitions that have not changed are
+    not loaded again after the manifest has been refreshed.
+    """
+    with metrics.stage("partition_loading"):
+        return _build_dataset(
+            _read_partition(partition),
+            "{}@{}".format(partition.file, partition.checksum),
+        )
+
+
+def _query_partitions(
+    query, combine, dataset, max_date: np.datetime64, min_date: np.datetime64, *args
+):
+    """
+    Runs `query(partition, max_date, min_date, *args)` on the snapshot of every partition needed for the time range
+    [min_date, max_date) and combines their results with `combine`. All versions of an animal are in the partition of
+    the year of its `Einlieferungsdatum`, so the counts of the partitions add up.
+
+    Parameters
+    ----------
+    query
+        aggregation of a `RobDataset`, e.g., `_query_length_of_stay`.
+
+    combine
+        function combining the list of the results of the partitions, e.g., `_combine_length_of_stay`.
+
+    dataset
+        `RobDataset` or `PartitionedRobDataset`.
+
+    max_date
+        maximal date.
+
+    min_date
+        minimal date.
+
+    args
+        further arguments of `query`.
+
+    Returns
+    -------
+    The combined result, which is the result of `query` itself if only one partition is needed.
+    """
+    results = [
+        query(partition, max_date, min_date, *args)
+        for partition in _datasets_for_range(dataset, max_date, min_date)
+    ]
+    if len(results) == 1:
+        return results[0]
+    with metrics.stage("aggregation"):
+        return combine(results)
+
+
+def _load_partitioned_dataset():
+    """
+    Loads the catalog of the partitioned layout.
+
+    Returns
+    -------
+    A `PartitionedRobDataset`, or `None` if there is no partitioned layout or it cannot be reached, in which case
+    `rob.csv` (or its local snapshot) is used.
+    """
+    if OFFLINE or not PARTITIONS_PREFIX:
+        return None
+    try:
+        partition_list, validator = _fetch_manifest()
+    except (FileNotFoundError, botocore.exceptions.BotoCoreError):
+        return None
+    if not partition_list:
+        return None
+    return PartitionedRobDataset(version=validator, partitions=partition_list)
+
+
+def _fetch_changed_dataset(dataset: RobDataset):
+    """
+    Fetches the data from its source and builds a new snapshot if the data has changed. The whole file is parsed
+    anyway, so the new snapshot is built from it instead of merging the changed rows into `dataset`, in which rows that
+    have been deleted or corrected in the source would survive.
+
+    Parameters
+    ----------
+    dataset
+        current snapshot of the data.
+
+    Returns
+    -------
+    A new `RobDataset` (or `PartitionedRobDataset` with the refreshed manifest if `dataset` is partitioned), or `None`
+    if the data has not changed.
+    """
+    if OFFLINE:
+        return None
+    if isinstance(dataset, PartitionedRobDataset):
+        partition_list, validator = _fetch_manifest(dataset.version)
+        if not partition_list:
+            return None
+        return PartitionedRobDataset(version=validator, partitions=partition_list)
+    df_new, validator, last_modified = _fetch_rob(dataset.version)
+    if df_new is None:
+        return None
+    _write_snapshot(df_new, validator, last_modified)
+    return _build_dataset(df_new, validator)
+
+
+def _attach_shared_dataset():
+    """
+    Memory-maps the dataset published in `SHARED_DATASET_DIR`.
+
+    Returns
+    -------
+    The published `RobDataset`, or `None` if nothing has been published yet.
+    """
+    global _SHARED_VERSION
+    dataset, _SHARED_VERSION = shared_dataset.attach_dataset(
+        RobDataset, SHARED_DATASET_DIR
+    )
+    return dataset
+
+
+def _load_dataset() -> RobDataset:
+    """
+    Loads the data and builds its snapshot. If `SHARED_DATASET_DIR` is set, the first worker process publishes the
+    snapshot and all worker processes memory-map the published snapshot. The catalog of the partitioned layout takes
+    precedence over `rob.csv` and is not published, since every worker process loads the partitions it needs.
+
+    Returns
+    -------
+    A `RobDataset` with the data and everything derived from it, or a `PartitionedRobDataset`.
+    """
+    dataset = _load_partitioned_dataset()
+    if dataset is not None:
+        return dataset
+    if not SHARED_DATASET_DIR:
+        return _build_dataset(*_load_rob())
+    with shared_dataset.exclusive(SHARED_DATASET_DIR):
+        try:
+            dataset = _attach_shared_dataset()
+        except FileNotFoundError:
+            # The published snapshot lacks fields of `RobDataset`, i.e., it has been published by an older version of
+            # the app
+            dataset = None
+        if dataset is None:
+            dataset = _build_dataset(*_load_rob())
+        else:
+            # The published snapshot may be outdated, e.g., after a restart of the app
+            try:
+                dataset = _fetch_changed_dataset(dataset)
+            except Exception as error:
+                print("The published data could not be revalidated.")
+                print(error)
+                dataset = None
+        if dataset is not None:
+            shared_dataset.publish_dataset(dataset, SHARED_DATASET_DIR)
+    return _attach_shared_dataset()
+
+
+_SHARED_VERSION = None
+# Snapshot of the data, which is `None` until it has been loaded in the background, see `start_loading`
+_DATASET = None
+_QUERY_BACKEND = None
+_LOADED = threading.Event()
+_LOADER = None
+# Loads every partition once, also if several queries need it at the same time, see `_datasets_for_range`
+_PARTITION_FLIGHTS = coalescing.SingleFlight()
+_REFRESH_LOCK = threading.Lock()
+_REFRESHER = None
+_REFRESH_LISTENERS = []
+
+
+def start_loading() -> threading.Thread:
+    """
+    Starts a daemon thread that loads the data, so a slow or failing data source does not block the app from serving
+    requests. Loading is retried every `LOAD_RETRY_INTERVAL` seconds until it succeeds. The thread is started at most
+    once per process.
+
+    Returns
+    -------
+    The loader thread.
+    """
+    global _LOADER
+
+    def _load_until_loaded():
+        global _DATASET
+        while True:
+            try:
+                _DATASET = _load_dataset()
+            except Exception as error:
+                print("The data could not be loaded.")
+                print(error)
+                time.sleep(LOAD_RETRY_INTERVAL)
+                continue
+            _LOADED.set()
+            return
+
+    with _REFRESH_LOCK:
+        if _LOADER is None:
+            _LOADER = threading.Thread(
+                target=_load_until_loaded, name="rob-loader", daemon=True
+            )
+            _LOADER.start()
+    return _LOADER
+
+
+def is_dataset_loaded() -> bool:
+    """
+    Returns whether the data has been loaded, i.e., whether `get_dataset` returns without waiting.
+    """
+    return _LOADED.is_set()
+
+
+def get_dataset(timeout: float = None) -> RobDataset:
+    """
+    Returns the current snapshot of the data. If the data has not been loaded yet, loading is started and awaited.
+
+    Parameters
+    ----------
+    timeout
+        maximal time to wait for the data in seconds, defaults to waiting until the data has been loaded.
+
+    Returns
+    -------
+    The current `RobDataset`, or a `PartitionedRobDataset` if the data is in the partitioned layout.
+    """
+    if not _LOADED.is_set():
+        start_loading()
+        if not _LOADED.wait(timeout):
+            raise TimeoutError("The data has not been loaded yet.")
+    return _DATASET
+
+
+def add_refresh_listener(listener):
+    """
+    Registers a function that is called with the new snapshot of the data whenever a new snapshot has been swapped in.
+
+    Parameters
+    ----------
+    listener
+        function taking a `RobDataset` (or `PartitionedRobDataset`).
+    """
+    _REFRESH_LISTENERS.append(listener)
+
+
+def refresh_dataset() -> bool:
+    """
+    Fetches the data from its source and swaps in a new snapshot if the data has changed. Requests are served from the
+    current snapshot in the meantime. If `SHARED_DATASET_DIR` is set, only one worker process fetches the data and
+    publishes the new snapshot, and all other worker processes attach to it.
+
+    Returns
+    -------
+    `True` if a new snapshot has been swapped in, otherwise `False`.
+    """
+    global _DATASET
+    if not _LOADED.is_set():
+        # The data is still being loaded for the first time
+        return False
+    with _REFRESH_LOCK:
+        if not SHARED_DATASET_DIR or isinstance(_DATASET, PartitionedRobDataset):
+            dataset = _fetch_changed_dataset(_DATASET)
+        elif shared_dataset.published_version(SHARED_DATASET_DIR) != _SHARED_VERSION:
+            # Another worker process has published a new snapshot in the meantime
+            dataset = _attach_shared_dataset()
+        else:
+            dataset = None
+            with shared_dataset.exclusive(
+                SHARED_DATASET_DIR, blocking=False
+            ) as is_publisher:
+                if is_publisher:
+                    published = _fetch_changed_dataset(_DATASET)
+                    if published is not None:
+                        shared_dataset.publish_dataset(published, SHARED_DATASET_DIR)
+                        dataset = _attach_shared_dataset()
+        if dataset is None:
+            return False
+        # Rebinding the global is atomic, so readers either get the old or the new snapshot
+        _DATASET = dataset
+    for listener in _REFRESH_LISTENERS:
+        listener(dataset)
+    return True
+
+
+def start_refresher(interval: float = REFRESH_INTERVAL) -> threading.Thread:
+    """
+    Starts a daemon thread that refreshes the data every `interval` seconds. The thread is started at most once per
+    process.
+
+    Parameters
+    ----------
+    interval
+        time between two refreshes in seconds.
+
+    Returns
+    -------
+    The refresher thread.
+    """
+    global _REFRESHER
+
+    def _refresh_periodically():
+        while True:
+            time.sleep(interval)
+            try:
+                refresh_dataset()
+            except Exception as error:
+                # The current snapshot stays in place and the next refresh is tried after the next interval
+                print("The data could not be refreshed.")
+                print(error)
+
+    with _REFRESH_LOCK:
+        if _REFRESHER is None:
+            _REFRESHER = threading.Thread(
+                target=_refresh_periodically, name="rob-refresher", daemon=True
+            )
+            _REFRESHER.start()
+    return _REFRESHER
+
+
+@metrics.instrument()
+def create_part_to_whole(
+    max_date: datetime = pd.to_datetime("today"),
+    min_date: datetime = pd.to_datetime("1990-04-30"),
+):
+    """
+    Computes the parts to whole of seals in rehabilitation, released, and died within the time range
+    [min_date, max_date).
+
+    Parameters
+    ----------
+    max_date
+        maximal date.
+
+    min_date
+        minimal date.
+
+    Returns
+    -------
+    A `pandas DataFrame` describing temporally filtered parts to whole (in rehabilitation, released, died).
+    """
+    max_date, min_date = _to_datetime64(max_date), _to_datetime64(min_date)
+    # The memoized result is shared, so callers get a copy they may modify
+    return _part_to_whole(get_dataset(), max_date, min_date).copy()
+
+
+def _part_to_whole(
+    dataset, max_date: np.datetime64, min_date: np.datetime64
+) -> pd.Series:
+    """
+    Computes the parts to whole of `create_part_to_whole` with the query backend on the partitions of `dataset`.
+    """
+    return _query_partitions(
+        _QUERY_BACKEND.part_to_whole,
+        _combine_part_to_whole,
+        dataset,
+        max_date,
+        min_date,
+    )
+
+
+def _combine_part_to_whole(results: list) -> pd.Series:
+    """
+    Adds up the counts per status of several partitions.
+    """
+    ds_part_to_whole = pd.concat(results).groupby(level=0).sum()
+    return (
+        ds_part_to_whole[ds_part_to_whole > 0]
+        .sort_values(ascending=False, kind="mergesort")
+        .rename("Aktuell")
+    )
+
+
+def _query_part_to_whole(
+    dataset: RobDataset, max_date: np.datetime64, min_date: np.datetime64
+) -> pd.Series:
+    """
+    Counts the statuses of the animals admitted within the time range [min_date, max_date) from the status intervals
+    of `dataset`.
+    """
+    status_intervals = dataset.status_intervals
+    with metrics.stage("filtering"):
+        start = np.searchsorted(status_intervals.admission, min_date)
+        # The status of an animal at `max_date` is the one of its latest `Erstellt_am` before `max_date`
+        is_current = (status_intervals.valid_from[start:] < max_date) & (
+            status_intervals.valid_to[start:] >= max_date
+        )
+    with metrics.stage("aggregation"):
+        counts = np.bincount(
+            status_intervals.status[start:][is_current],
+            minlength=status_intervals.labels.size,
+        )
+        ds_part_to_whole = pd.Series(
+            counts, index=status_intervals.labels, name="Aktuell"
+        )
+        return ds_part_to_whole[ds_part_to_whole > 0].sort_values(
+            ascending=False, kind="mergesort"
+        )
+
+
+@metrics.instrument()
+def create_time_series(
+    max_date: datetime = pd.to_datetime("today"),
+    min_date: datetime = pd.to_datetime("1990-04-30"),
+):
+    """
+    Computes the weekly count of seals admitted to the Seehundstation Friedsrichskoog within the time range
+    [min_date, max_date).
+
+    Parameters
+    ----------
+    max_date
+        maximal date.
+
+    min_date
+        minial date.
+
+    Returns
+    -------
+    A `pandas DataFrame` describing temporally filtered time series of weekly counts of admitted seals.
+    """
+    max_date, min_date = _to_datetime64(max_date), _to_datetime64(min_date)
+    # The memoized result is shared, so callers get a copy they may modify
+    return _time_series(get_dataset(), max_date, min_date).copy()
+
+
+def _time_series(
+    dataset, max_date: np.datetime64, min_date: np.datetime64
+) -> pd.DataFrame:
+    """
+    Computes the weekly counts of `create_time_series` with the query backend on the partitions of `dataset`.
+    """
+    return _query_partitions(
+        _QUERY_BACKEND.time_series,
+        _combine_time_series,
+        dataset,
+        max_date,
+        min_date,
+    )
+
+
+def _concat_results(results: list, keys: list) -> pd.DataFrame:
+    """
+    Concatenates the results of several partitions. Categorical `keys` are converted to strings, such that they are
+    grouped and sorted alphabetically, as the categories of the partitions may differ or be in order of appearance.
+    """
+    df_results = pd.concat(results, ignore_index=True)
+    return df_results.astype(
+        {
+            key: object
+            for key in keys
+            if isinstance(df_results[key].dtype, pd.CategoricalDtype)
+        }
+    )
+
+
+def _combine_time_series(results: list) -> pd.DataFrame:
+    """
+    Adds up the weekly counts of several partitions, whose weeks overlap at the turn of the year.
+    """
+    return (
+        _concat_results(results, ["Tierart"])
+        .groupby(["Tierart", "Einlieferungswoche"], observed=True, sort=False)["Anzahl"]
+        .sum()
+        .reset_index()
+        .sort_values(by=["Tierart", "Einlieferungswoche"], kind="mergesort")
+        .reset_index(drop=True)
+    )
+
+
+@_memoize_by_version()
+def _query_time_series(
+    dataset: RobDataset, max_date: np.datetime64, min_date: np.datetime64
+) -> pd.DataFrame:
+    """
+    Slices the weekly counts of admitted seals within the time range [min_date, max_date) from the weekly cube of
+    `dataset`.
+    """
+    weekly_cube = dataset.weekly_cube
+    with metrics.stage("filtering"):
+        start, end = np.searchsorted(weekly_cube.weeks, [min_date, max_date])
+        end = max(start, end)
+        counts = weekly_cube.counts[:, start:end]
+    with metrics.stage("aggregation"):
+        tierart_codes, week_codes = np.nonzero(counts)
+        return pd.DataFrame(
+            {
+                "Tierart": weekly_cube.tierarten.take(tierart_codes),
+                "Einlieferungswoche": weekly_cube.weeks[start + week_codes],
+                "Anzahl": counts[tierart_codes, week_codes],
+            },
+            index=weekly_cube.ranks[tierart_codes, start + week_codes],
+        )
+
+
+@metrics.instrument()
+def create_adaptive_time_series(
+    max_date: datetime = pd.to_datetime("today"),
+    min_date: datetime = pd.to_datetime("1990-04-30"),
+    max_points: int = TIME_SERIES_MAX_POINTS,
+    downsampling: str = TIME_SERIES_DOWNSAMPLING,
+):
+    """
+    Computes the count of seals admitted to the Seehundstation Friedrichskoog within the time range [min_date, max_date)
+    with at most `max_points` points per `Tierart`. Time ranges of at most `max_points` weeks are returned like
+    `create_time_series`. Longer time ranges are either binned into months, quarters, or years, whichever is the finest
+    resolution within `max_points`, or downsampled to the weeks that preserve the shape of the time series
+    (Largest-Triangle-Three-Buckets), each of which is assigned the count of its bucket of weeks. Both keep the total
+    count of admitted seals unchanged.
+
+    Parameters
+    ----------
+    max_date
+        maximal date.
+
+    min_date
+        minimal date.
+
+    max_points
+        maximal number of points per `Tierart`.
+
+    downsampling
+        "bins" to bin long time ranges, or "lttb" to downsample them.
+
+    Returns
+    -------
+    A `pandas DataFrame` describing temporally filtered time series of counts of admitted seals. Its second column is
+    named after the resolution, i.e., "Einlieferungswoche", "Einlieferungsmonat", "Einlieferungsquartal", or
+    "Einlieferungsjahr".
+    """
+    max_date, min_date = _to_datetime64(max_date), _to_datetime64(min_date)
+    # The memoized result is shared, so callers get a copy they may modify
+    return _query_adaptive_time_series(
+        get_dataset(),
+        max_date,
+        min_date,
+        max_points,
+        downsampling,
+    ).copy()
+
+
+def _query_adaptive_time_series(
+    dataset: RobDataset,
+    max_date: np.datetime64,
+    min_date: np.datetime64,
+    max_points: int = TIME_SERIES_MAX_POINTS,
+    downsampling: str = TIME_SERIES_DOWNSAMPLING,
+) -> pd.DataFrame:
+    """
+    Computes the time series of `create_adaptive_time_series`. Short time ranges are computed by the query backend, long
+    ones are binned or downsampled from the weekly cube of `dataset`, which is merged from the weekly cubes of its
+    partitions.
+    """
+    datasets = _datasets_for_range(dataset, max_date, min_date)
+    if len(datasets) == 1:
+        weekly_cube = datasets[0].weekly_cube
+    else:
+        with metrics.stage("aggregation"):
+            weekly_cube = _merge_weekly_cubes(
+                [partition.weekly_cube for partition in datasets]
+            )
+    with metrics.stage("filtering"):
+        start, end = np.searchsorted(weekly_cube.weeks, [min_date, max_date])
+        end = max(start, end)
+    if end - start <= max_points:
+        return _time_series(dataset, max_date, min_date)
+    with metrics.stage("aggregation"):
+        return _aggregate_time_series(weekly_cube, start, end, max_points, downsampling)
+
+
+def _aggregate_time_series(
+    weekly_cube: WeeklyCube, start: int, end: int, max_points: int, downsampling: str
+) -> pd.DataFrame:
     """
-    try:
-        # The S3-bucket grants read rights to the public, so we do not need to provide credentials
-        config = botocore.client.Config(signature_version=botocore.UNSIGNED)
-        s3 = boto3.client("s3", config=config)
-        rob_obj = s3.get_object(Bucket=S3_BUCKET, Key=KEY)
-        df_rob = pd.read_csv(io.BytesIO(rob_obj["Body"].read()))
-    except botocore.exceptions.ClientError as error:
-        if error.response["Error"]["Code"] == "NoSuchKey":
-            print(
-                f"The key '{KEY}' you are trying to access in AWS-S3-bucket {S3_BUCKET} does not exist."
+    Bins or downsamples the weeks [start, end) of `weekly_cube` to at most `max_points` points per `Tierart`, see
+    `create_adaptive_time_series`.
+    """
+    if downsampling == "lttb":
+        tierart_codes, week_codes, counts = [], [], []
+        for tierart_code in range(weekly_cube.tierarten.size):
+            selected, bucket_edges = _lttb(
+                weekly_cube.counts[tierart_code, start:end], max_points
             )
-        elif error.response["Error"]["Code"] == "AccessDenied":
-            print(
-                f"The access to key '{KEY}' in AWS-S3-bucket {S3_BUCKET} is denied. It could be that the key does not"
-                f" exist."
+            tierart_codes.append(np.full(selected.size, tierart_code))
+            week_codes.append(selected)
+            # Every selected week carries the count of its bucket, so the total count is kept
+            cumulative = weekly_cube.cumulative[tierart_code]
+            counts.append(
+                cumulative[start + bucket_edges[1:]]
+                - cumulative[start + bucket_edges[:-1]]
             )
-        else:
-            print("An unexpected exception has occurred.")
-            print(error)
-        raise
-    except:
-        print("An unexpected exception has occurred.")
-        raise
-    else:
-        df_rob = df_rob.astype(
+        tierart_codes = np.concatenate(tierart_codes).astype(np.int64)
+        week_codes = start + np.concatenate(week_codes).astype(np.int64)
+        return pd.DataFrame(
             {
-                "Long": "float64",
-                "Lat": "float64",
-                "Einlieferungsdatum": "datetime64[ns]",
+                "Tierart": weekly_cube.tierarten.take(tierart_codes),
+                "Einlieferungswoche": weekly_cube.weeks[week_codes],
+                "Anzahl": np.concatenate(counts),
             }
         )
-        df_rob = df_rob.assign(
-            Erstellt_am=pd.to_datetime(df_rob["Erstellt_am"]).dt.tz_localize(None),
-            Sys_aktualisiert_am=pd.to_datetime(df_rob["Sys_aktualisiert_am"]).dt.tz_localize(None)
-        )
 
-        return df_rob
+    # Weeks are assigned to the month, quarter, or year of their last day, like in `create_time_series`
+    months = weekly_cube.weeks[start:end].astype("datetime64[M]")
+    month_numbers = months.astype(np.int64)
+    for column, bins in (
+        ("Einlieferungsmonat", months),
+        (
+            "Einlieferungsquartal",
+            (month_numbers - month_numbers % 3).astype("datetime64[M]"),
+        ),
+        ("Einlieferungsjahr", months.astype("datetime64[Y]")),
+    ):
+        bin_starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        if bin_starts.size <= max_points:
+            break
+    edges = start + np.r_[bin_starts, end - start]
+    # The counts per bin are differences of the prefix sums at the bin edges
+    counts = (
+        weekly_cube.cumulative[:, edges[1:]] - weekly_cube.cumulative[:, edges[:-1]]
+    )
+    tierart_codes, bin_codes = np.nonzero(counts)
+    return pd.DataFrame(
+        {
+            "Tierart": weekly_cube.tierarten.take(tierart_codes),
+            column: bins[bin_starts[bin_codes]].astype("datetime64[ns]"),
+            "Anzahl": counts[tierart_codes, bin_codes],
+        }
+    )
+
 
+def _lttb(values: np.ndarray, n_points: int) -> tuple:
+    """
+    Selects `n_points` of equidistant `values` that preserve the shape of their line chart with the
+    Largest-Triangle-Three-Buckets algorithm.
 
-DF_ROB = _load_rob()
+    Parameters
+    ----------
+    values
+        values of the line chart.
 
+    n_points
+        number of points to be selected.
 
-def create_part_to_whole(
+    Returns
+    -------
+    A tuple of the sorted positions of the selected values and the edges of their buckets, i.e., the i-th selected
+    value represents the values [edges[i], edges[i + 1]).
+    """
+    if n_points >= values.size or n_points < 3:
+        n_selected = min(values.size, max(n_points, 0))
+        return np.arange(n_selected), np.r_[np.arange(n_selected), values.size]
+    values = values.astype(np.float64)
+    # The first and the last point are always kept, the others are split into `n_points - 2` buckets
+    bucket_edges = np.linspace(1, values.size - 1, n_points - 1).astype(np.int64)
+    selected = np.empty(n_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, values.size - 1
+    for bucket in range(n_points - 2):
+        bucket_start, bucket_end = bucket_edges[bucket], bucket_edges[bucket + 1]
+        if bucket + 2 < n_points - 1:
+            next_start, next_end = bucket_edges[bucket + 1], bucket_edges[bucket + 2]
+        else:
+            next_start, next_end = values.size - 1, values.size
+        next_x = (next_start + next_end - 1) / 2
+        next_y = values[next_start:next_end].mean()
+        previous = selected[bucket]
+        candidates = np.arange(bucket_start, bucket_end)
+        areas = np.abs(
+            (previous - next_x) * (values[candidates] - values[previous])
+            - (previous - candidates) * (next_y - values[previous])
+        )
+        selected[bucket + 1] = candidates[np.argmax(areas)]
+    return selected, np.r_[0, bucket_edges, values.size]
+
+
+@metrics.instrument()
+def create_bubbles(
     max_date: datetime = pd.to_datetime("today"),
     min_date: datetime = pd.to_datetime("1990-04-30"),
 ):
     """
-    Computes the parts to whole of seals in rehabilitation, released, and died within the time range
-    [min_date, max_date).
+    Computes the count of seals admitted to the Seehundstation Friedrichskoog for different finding places within the
+    time range [min_date, max_date).
 
     Parameters
     ----------
@@ -76,70 +1737,361 @@ def create_part_to_whole(
 
     Returns
     -------
-    A `pandas DataFrame` describing temporally filtered parts to whole (in rehabilitation, released, died).
+    A `pandas DataFrame` describing temporally filtered counts of admitted seals for different finding places.
     """
-    df_time_slice = DF_ROB.loc[
-        (DF_ROB["Einlieferungsdatum"] >= min_date) & (DF_ROB["Erstellt_am"] < max_date),
-        ["Erstellt_am", "Sys_id"],
-    ]
-    df_latest_by_id = (
-        df_time_slice.sort_values(by=["Sys_id", "Erstellt_am"])
-        .groupby(["Sys_id"])
-        .last()
+    max_date, min_date = _to_datetime64(max_date), _to_datetime64(min_date)
+    # The memoized result is shared, so callers get a copy they may modify
+    return _bubbles(get_dataset(), max_date, min_date).copy()
+
+
+def _bubbles(dataset, max_date: np.datetime64, min_date: np.datetime64) -> pd.DataFrame:
+    """
+    Computes the counts per finding place of `create_bubbles` with the query backend on the partitions of `dataset`.
+    """
+    return _query_partitions(
+        _QUERY_BACKEND.bubbles,
+        _combine_bubbles,
+        dataset,
+        max_date,
+        min_date,
     )
-    return pd.merge(
-        df_latest_by_id,
-        DF_ROB,
-        how="left",
-        on=["Erstellt_am", "Sys_id"],
-    )["Aktuell"].value_counts()
 
 
-def create_time_series(
-    max_date: datetime = pd.to_datetime("today"),
-    min_date: datetime = pd.to_datetime("1990-04-30"),
-):
+def _combine_bubbles(results: list) -> pd.DataFrame:
     """
-    Computes the weekly count of seals admitted to the Seehundstation Friedsrichskoog within the time range
-    [min_date, max_date).
+    Adds up the counts per finding place of several partitions. Further columns, e.g., the cells of the pyramid of
+    finding places, are the same for all partitions.
+    """
+    locations = ["Fundort", "Long", "Lat"]
+    df_bubbles = _concat_results(results, locations)
+    return (
+        df_bubbles.groupby(locations, observed=True, sort=False)
+        .agg(
+            {
+                column: "sum" if column == "Anzahl" else "first"
+                for column in df_bubbles.columns.drop(locations)
+            }
+        )
+        .reset_index()
+        .sort_values(by=locations, kind="mergesort")
+        .reset_index(drop=True)
+    )
+
+
+def _query_bubbles(
+    dataset: RobDataset, max_date: np.datetime64, min_date: np.datetime64
+) -> pd.DataFrame:
+    """
+    Counts the admitted seals per finding place within the time range [min_date, max_date) from the location index of
+    `dataset`.
+    """
+    location_index = dataset.location_index
+    counts = _count_by_location(location_index, max_date, min_date)
+    with metrics.stage("aggregation"):
+        found = np.flatnonzero(counts)
+        return (
+            location_index.locations.iloc[found]
+            .assign(Anzahl=counts[found])
+            .reset_index(drop=True)
+        )
+
+
+def _count_by_location(
+    location_index: LocationIndex, max_date: np.datetime64, min_date: np.datetime64
+) -> np.ndarray:
+    """
+    Counts the admitted seals per finding place within the time range [min_date, max_date), i.e., per row of
+    `location_index.locations`.
+    """
+    with metrics.stage("filtering"):
+        start, end = np.searchsorted(location_index.admission, [min_date, max_date])
+        location_codes = location_index.location_codes[start : max(start, end)]
+    with metrics.stage("aggregation"):
+        n_locations = len(location_index.locations)
+        if location_index.has_repeats:
+            location_codes = (
+                np.unique(
+                    location_index.sys_ids[start : max(start, end)] * n_locations
+                    + location_codes
+                )
+                % n_locations
+            )
+        return np.bincount(location_codes, minlength=n_locations)
+
+
+class BubbleViewport(NamedTuple):
+    """
+    Visible part of the bubble map quantized to the cells of the pyramid of finding places, see `bubble_viewport`. The
+    ranges of columns and rows of the cells of `level` are inclusive.
+    """
+
+    level: int
+    detail: bool
+    columns: tuple
+    rows: tuple
+
+
+def bubble_viewport(zoom: float, bounds: tuple = None) -> BubbleViewport:
+    """
+    Quantizes the view of the bubble map to the cells of the pyramid of finding places. Mapbox renders the world
+    512 * 2**zoom pixels wide, so the cells of level `floor(zoom) + 3` are 64 to 128 pixels wide on the screen. Nearby
+    views share their viewport, so their bubbles can be cached.
 
     Parameters
     ----------
-    max_date
-        maximal date.
+    zoom
+        zoom level of the map.
 
-    min_date
-        minial date.
+    bounds
+        tuple of the minimal longitude, minimal latitude, maximal longitude, and maximal latitude of the visible map,
+        defaults to the whole world. The visible cells are extended by one cell on each side, so bubbles at the edges
+        are not cut off while panning.
 
     Returns
     -------
-    A `pandas DataFrame` describing temporally filtered time series of weekly counts of admitted seals.
+    A `BubbleViewport` whose bubbles are clustered unless the zoom level has reached `BUBBLES_DETAIL_ZOOM`.
     """
-    df_time_series = (
-        DF_ROB[["Sys_id", "Einlieferungsdatum", "Tierart"]]
-        .drop_duplicates()
-        .groupby(
-            ["Tierart", pd.Grouper(key="Einlieferungsdatum", axis=0, freq="W-MON")]
+    level = int(np.clip(np.floor(zoom) + 3, 0, _BUBBLE_LEVELS - 1))
+    last = 2**level - 1
+    columns, rows = (0, last), (0, last)
+    if bounds is not None:
+        min_long, min_lat, max_long, max_lat = bounds
+        # Rows count from the north
+        x, y = _to_tiles([min_long, max_long], [max_lat, min_lat], level)
+        if x[0] <= x[1]:
+            columns = (
+                max(int(np.floor(x[0])) - 1, 0),
+                min(int(np.floor(x[1])) + 1, last),
+            )
+        rows = (max(int(np.floor(y[0])) - 1, 0), min(int(np.floor(y[1])) + 1, last))
+    return BubbleViewport(
+        level=level,
+        detail=zoom >= BUBBLES_DETAIL_ZOOM,
+        columns=columns,
+        rows=rows,
+    )
+
+
+@metrics.instrument()
+def query_bubble_clusters(
+    start_date: str,
+    end_date: str,
+    viewport: BubbleViewport,
+    dataset: RobDataset = None,
+) -> pd.DataFrame:
+    """
+    Computes the bubbles of the map within `viewport` for the time range [start_date, end_date). The counts of the
+    finding places are summed per cell of the pyramid, unless `viewport.detail` is set. Results must not be modified.
+
+    Parameters
+    ----------
+    start_date
+        start date of the considered time period in the format YYYY-MM-DD.
+
+    end_date
+        end date of the considered time period in the format YYYY-MM-DD.
+
+    viewport
+        visible part of the map, see `bubble_viewport`.
+
+    dataset
+        snapshot of the data, defaults to the current snapshot.
+
+    Returns
+    -------
+    A `pandas DataFrame` with the columns of `create_bubbles`. Bubbles of several finding places are placed at their
+    center weighted by their counts, and are labeled with their largest finding places.
+    """
+    max_date, min_date = _parse_date_range(start_date, end_date)
+    df_clusters = _query_bubble_clusters(
+        dataset or get_dataset(), max_date, min_date, viewport.level, viewport.detail
+    )
+    with metrics.stage("filtering"):
+        columns = df_clusters["Zelle"].to_numpy() % 2**viewport.level
+        rows = df_clusters["Zelle"].to_numpy() // 2**viewport.level
+        is_visible = (
+            (columns >= viewport.columns[0])
+            & (columns <= viewport.columns[1])
+            & (rows >= viewport.rows[0])
+            & (rows <= viewport.rows[1])
         )
-        .count()
-        .reset_index()
-        .rename(
-            columns={"Einlieferungsdatum": "Einlieferungswoche", "Sys_id": "Anzahl"}
+        return df_clusters[is_visible].drop(columns="Zelle").reset_index(drop=True)
+
+
+@_memoize_by_version(maxsize=QUERY_CACHE_SIZE)
+def _query_bubble_clusters(
+    dataset,
+    max_date: np.datetime64,
+    min_date: np.datetime64,
+    level: int,
+    detail: bool,
+) -> pd.DataFrame:
+    """
+    Counts the admitted seals per cell of `level` of the pyramid of finding places (or per finding place if `detail` is
+    set) within the time range [min_date, max_date) on the partitions of `dataset`. The column "Zelle" holds the cells
+    of `level`.
+    """
+    locations = _query_partitions(
+        _query_location_cells, _combine_bubbles, dataset, max_date, min_date, level
+    )
+    if detail:
+        return locations
+    with metrics.stage("aggregation"):
+        cluster_cells, clusters = np.unique(
+            locations["Zelle"].to_numpy(), return_inverse=True
+        )
+        weights = locations["Anzahl"].to_numpy(dtype=np.float64)
+        anzahl = np.bincount(clusters, weights=weights)
+        # Finding places are labeled by their count in descending order
+        order = np.lexsort((-weights, clusters))
+        fundorte = locations["Fundort"].to_numpy(dtype=object)[order]
+        edges = np.searchsorted(clusters[order], np.arange(cluster_cells.size + 1))
+        labels = []
+        for first, last in zip(edges[:-1], edges[1:]):
+            if last - first <= 2:
+                labels.append(", ".join(fundorte[first:last]))
+            else:
+                labels.append(
+                    "{} und {} weitere".format(
+                        ", ".join(fundorte[first : first + 2]), last - first - 2
+                    )
+                )
+        return pd.DataFrame(
+            {
+                "Fundort": labels,
+                "Long": np.bincount(
+                    clusters, weights=weights * locations["Long"].to_numpy()
+                )
+                / anzahl,
+                "Lat": np.bincount(
+                    clusters, weights=weights * locations["Lat"].to_numpy()
+                )
+                / anzahl,
+                "Anzahl": anzahl.astype(np.int64),
+                "Zelle": cluster_cells,
+            }
+        )
+
+
+def _query_location_cells(
+    dataset: RobDataset, max_date: np.datetime64, min_date: np.datetime64, level: int
+) -> pd.DataFrame:
+    """
+    Counts the admitted seals per finding place within the time range [min_date, max_date) from the location index of
+    `dataset`, like `_query_bubbles`, with the cells of `level` of the pyramid of finding places in the column "Zelle".
+    """
+    location_index = dataset.location_index
+    counts = _count_by_location(location_index, max_date, min_date)
+    with metrics.stage("aggregation"):
+        found = np.flatnonzero(counts)
+        return (
+            location_index.locations.iloc[found]
+            .assign(Anzahl=counts[found], Zelle=location_index.cells[level, found])
+            .reset_index(drop=True)
         )
+
+
+# Statuses that end the rehabilitation of an animal
+OUTCOMES = ("Ausgewildert", "Verstorben")
+
+
+class Stays(NamedTuple):
+    """
+    Completed stays of all animals whose outcome (`OUTCOMES`) has been recorded after they had been recorded in
+    rehabilitation, sorted by `Einlieferungsdatum`. A stay ends at the first `Erstellt_am` of the final status of the
+    animal. Stays of animals that are recorded with their outcome only are unknown, since the history starts after
+    they have left.
+    """
+
+    admission: np.ndarray
+    ended: np.ndarray
+    codes: np.ndarray
+    tierarten: np.ndarray
+
+
+@_memoize_by_version(maxsize=STAYS_CACHE_SIZE)
+def _build_stays(dataset: RobDataset) -> Stays:
+    """
+    Derives the completed stays of all animals from the `Erstellt_am` history of `dataset` with vectorized operations
+    on the boundaries of the animals and of the runs of their statuses.
+
+    Parameters
+    ----------
+    dataset
+        snapshot of the data.
+
+    Returns
+    -------
+    `Stays` whose codes combine the `Tierart`, the outcome, and the length of the stay in weeks, see
+    `_query_length_of_stay`.
+    """
+    df_history = dataset.df[
+        ["Sys_id", "Erstellt_am", "Einlieferungsdatum", "Tierart", "Aktuell"]
+    ].dropna()
+    sys_ids = pd.factorize(df_history["Sys_id"])[0]
+    created = df_history["Erstellt_am"].to_numpy(dtype="datetime64[ns]")
+    # Histories are appended in the order of `Erstellt_am`, so sorting by `Sys_id` usually suffices
+    order = np.argsort(sys_ids, kind="stable")
+    if np.any(
+        (created[order][1:] < created[order][:-1])
+        & (sys_ids[order][1:] == sys_ids[order][:-1])
+    ):
+        order = np.lexsort((created, sys_ids))
+    sys_ids, created = sys_ids[order], created[order]
+    status_codes, statuses = pd.factorize(df_history["Aktuell"])
+    status_codes = status_codes[order]
+    outcome_of_status = np.array(
+        [OUTCOMES.index(status) if status in OUTCOMES else -1 for status in statuses],
+        dtype=np.int64,
     )
-    return df_time_series[
-        (df_time_series["Einlieferungswoche"] >= min_date)
-        & (df_time_series["Einlieferungswoche"] < max_date)
-    ]
 
+    # Boundaries of the animals, and of the runs of the same status of an animal
+    is_first = np.ones(sys_ids.size, dtype=bool)
+    is_first[1:] = sys_ids[1:] != sys_ids[:-1]
+    is_last = np.ones(sys_ids.size, dtype=bool)
+    is_last[:-1] = is_first[1:]
+    is_run_start = is_first.copy()
+    is_run_start[1:] |= status_codes[1:] != status_codes[:-1]
+    run_starts = np.maximum.accumulate(
+        np.where(is_run_start, np.arange(sys_ids.size), 0)
+    )
+    last = np.flatnonzero(is_last)
+    final_run_start = run_starts[last]
+    outcome = outcome_of_status[status_codes[last]]
+    # The outcome must have been preceded by another status of the same animal
+    is_completed = (outcome >= 0) & ~is_first[final_run_start]
+    last, final_run_start = last[is_completed], final_run_start[is_completed]
+    outcome = outcome[is_completed]
 
-def create_bubbles(
+    admission = df_history["Einlieferungsdatum"].to_numpy(dtype="datetime64[ns]")
+    admission = admission[order][last]
+    ended = created[final_run_start]
+    weeks = np.clip(
+        (ended - admission) // np.timedelta64(7, "D"), 0, LENGTH_OF_STAY_MAX_WEEKS
+    )
+    tierart_codes, tierarten = pd.factorize(df_history["Tierart"], sort=True)
+    tierart_codes = tierart_codes[order][last]
+    codes = (tierart_codes * len(OUTCOMES) + outcome) * (
+        LENGTH_OF_STAY_MAX_WEEKS + 1
+    ) + weeks
+    by_admission = np.argsort(admission, kind="stable")
+    return Stays(
+        admission=admission[by_admission],
+        ended=ended[by_admission],
+        codes=codes[by_admission],
+        tierarten=np.asarray(tierarten, dtype=object),
+    )
+
+
+@metrics.instrument()
+def create_length_of_stay(
     max_date: datetime = pd.to_datetime("today"),
     min_date: datetime = pd.to_datetime("1990-04-30"),
 ):
     """
-    Computes the count of seals admitted to the Seehundstation Friedrichskoog for different finding places within the
-    time range [min_date, max_date).
+    Computes the distribution of the length of stay of the seals admitted to the Seehundstation Friedrichskoog within
+    the time range [min_date, max_date) that have been released or have died before `max_date`, per `Tierart` and
+    outcome.
 
     Parameters
     ----------
@@ -151,27 +2103,452 @@ def create_bubbles(
 
     Returns
     -------
-    A `pandas DataFrame` describing temporally filtered counts of admitted seals for different finding places.
+    A `pandas DataFrame` with the count of animals per `Tierart`, outcome ("Ausgang"), and length of stay in whole
+    weeks ("Verweildauer"). Stays of more than `LENGTH_OF_STAY_MAX_WEEKS` weeks are counted in its bin.
+    """
+    max_date, min_date = _to_datetime64(max_date), _to_datetime64(min_date)
+    # The memoized result is shared, so callers get a copy they may modify
+    return _length_of_stay(get_dataset(), max_date, min_date).copy()
+
+
+def _length_of_stay(
+    dataset, max_date: np.datetime64, min_date: np.datetime64
+) -> pd.DataFrame:
+    """
+    Computes the distribution of `create_length_of_stay` on the partitions of `dataset`.
+    """
+    return _query_partitions(
+        _query_length_of_stay,
+        _combine_length_of_stay,
+        dataset,
+        max_date,
+        min_date,
+    )
+
+
+def _combine_length_of_stay(results: list) -> pd.DataFrame:
+    """
+    Adds up the distributions of the length of stay of several partitions.
+    """
+    keys = ["Tierart", "Ausgang", "Verweildauer"]
+    return (
+        _concat_results(results, keys)
+        .groupby(keys, sort=False)["Anzahl"]
+        .sum()
+        .reset_index()
+        .sort_values(by=keys, kind="mergesort")
+        .reset_index(drop=True)
+    )
+
+
+@_memoize_by_version(maxsize=QUERY_CACHE_SIZE)
+def _query_length_of_stay(
+    dataset: RobDataset, max_date: np.datetime64, min_date: np.datetime64
+) -> pd.DataFrame:
+    """
+    Counts the completed stays of the animals admitted within the time range [min_date, max_date) from the stays of
+    `dataset`.
+    """
+    stays = _build_stays(dataset)
+    with metrics.stage("filtering"):
+        start, end = np.searchsorted(stays.admission, [min_date, max_date])
+        end = max(start, end)
+        codes = stays.codes[start:end][stays.ended[start:end] < max_date]
+    with metrics.stage("aggregation"):
+        n_weeks = LENGTH_OF_STAY_MAX_WEEKS + 1
+        counts = np.bincount(
+            codes, minlength=stays.tierarten.size * len(OUTCOMES) * n_weeks
+        )
+        found = np.flatnonzero(counts)
+        groups, weeks = np.divmod(found, n_weeks)
+        tierart_codes, outcome_codes = np.divmod(groups, len(OUTCOMES))
+        return pd.DataFrame(
+            {
+                "Tierart": stays.tierarten.take(tierart_codes),
+                "Ausgang": np.asarray(OUTCOMES, dtype=object).take(outcome_codes),
+                "Verweildauer": weeks,
+                "Anzahl": counts[found],
+            }
+        )
+
+
+def _length_of_stay_reference(
+    df_rob: pd.DataFrame, max_date: datetime, min_date: datetime
+) -> pd.DataFrame:
+    """
+    Reference implementation of `create_length_of_stay` that groups the runs of the statuses with pandas instead of
+    working on their boundaries.
     """
-    df_bubbles = DF_ROB[["Sys_id", "Einlieferungsdatum", "Fundort", "Long", "Lat"]]
-    df_bubbles = df_bubbles[
-        (df_bubbles["Einlieferungsdatum"] >= min_date)
-        & (df_bubbles["Einlieferungsdatum"] < max_date)
-    ].drop(columns=["Einlieferungsdatum"])
-    df_bubbles = (
-        df_bubbles.drop_duplicates()
-        .groupby(["Fundort", "Long", "Lat"])
-        .count()
+    df_history = df_rob[
+        ["Sys_id", "Erstellt_am", "Einlieferungsdatum", "Tierart", "Aktuell"]
+    ].dropna()
+    df_history = df_history.sort_values(by=["Sys_id", "Erstellt_am"], kind="mergesort")
+    is_first = df_history["Sys_id"] != df_history["Sys_id"].shift()
+    is_run_start = is_first | (df_history["Aktuell"] != df_history["Aktuell"].shift())
+    df_runs = (
+        df_history.assign(Lauf=is_run_start.cumsum(), Erster=is_first)
+        .groupby("Lauf")
+        .first()
+    )
+    df_final = df_runs.groupby("Sys_id").last()
+    df_final = df_final[
+        df_final["Aktuell"].isin(OUTCOMES)
+        & ~df_final["Erster"]
+        & (df_final["Einlieferungsdatum"] >= min_date)
+        & (df_final["Einlieferungsdatum"] < max_date)
+        & (df_final["Erstellt_am"] < max_date)
+    ]
+    weeks = (
+        (df_final["Erstellt_am"] - df_final["Einlieferungsdatum"])
+        // pd.Timedelta(days=7)
+    ).clip(0, LENGTH_OF_STAY_MAX_WEEKS)
+    return (
+        df_final.assign(Verweildauer=weeks)
+        .rename(columns={"Aktuell": "Ausgang"})
+        .groupby(["Tierart", "Ausgang", "Verweildauer"])
+        .size()
+        .rename("Anzahl")
         .reset_index()
-        .rename(columns={"Sys_id": "Anzahl"})
     )
-    return df_bubbles
+
+
+# Data that can be exported, see `query_export`
+EXPORTS = (
+    "part-to-whole",
+    "time-series",
+    "bubbles",
+    "length-of-stay",
+    "history",
+)
+
+
+@metrics.instrument()
+def query_export(
+    name: str, start_date: str, end_date: str, dataset: RobDataset = None
+) -> list:
+    """
+    Selects the data behind a chart of the app, or the raw history of the animals, for the time range
+    [start_date, end_date).
+
+    Parameters
+    ----------
+    name
+        "part-to-whole", "time-series" (weekly counts), "bubbles" (counts per finding place), "length-of-stay", or
+        "history" (all versions of the animals admitted within the time range).
+
+    start_date
+        start date of the considered time period in the format YYYY-MM-DD.
+
+    end_date
+        end date of the considered time period in the format YYYY-MM-DD.
+
+    dataset
+        snapshot of the data, defaults to the current snapshot.
+
+    Returns
+    -------
+    A list of pairs of a `pandas DataFrame` and the positions of its selected rows (`None` for all rows), i.e., one
+    pair per partition of the raw history, so it can be exported in chunks without copying it. Neither must be
+    modified.
+    """
+    if name not in EXPORTS:
+        raise ValueError(f"There is no export named '{name}'.")
+    max_date, min_date = _parse_date_range(start_date, end_date)
+    dataset = dataset or get_dataset()
+    if name == "part-to-whole":
+        ds_part_to_whole = _part_to_whole(dataset, max_date, min_date)
+        return [
+            (
+                ds_part_to_whole.rename_axis("Aktuell").rename("Anzahl").reset_index(),
+                None,
+            )
+        ]
+    if name == "time-series":
+        return [
+            (_time_series(dataset, max_date, min_date).reset_index(drop=True), None)
+        ]
+    if name == "bubbles":
+        return [(_bubbles(dataset, max_date, min_date), None)]
+    if name == "length-of-stay":
+        return [(_length_of_stay(dataset, max_date, min_date), None)]
+    parts = []
+    for partition in _datasets_for_range(dataset, max_date, min_date):
+        admission = partition.df["Einlieferungsdatum"].to_numpy(dtype="datetime64[ns]")
+        with metrics.stage("filtering"):
+            rows = np.flatnonzero((admission >= min_date) & (admission < max_date))
+        parts.append((partition.df, rows))
+    return parts
+
+
+class RangeQuery(NamedTuple):
+    """
+    Results of all aggregations displayed in the app for one date range.
+    """
+
+    part_to_whole: pd.Series
+    bubbles: pd.DataFrame
+    time_series: pd.DataFrame
+    length_of_stay: pd.DataFrame
+
+
+# Runs the aggregations of a date range in parallel, one per field of `RangeQuery`, see `query_date_range`
+_QUERY_POOL = ThreadPoolExecutor(
+    max_workers=len(RangeQuery._fields), thread_name_prefix="rob-query"
+)
+
+
+@metrics.instrument()
+def query_date_range(
+    start_date: str, end_date: str, dataset: RobDataset = None
+) -> RangeQuery:
+    """
+    Computes all aggregations displayed in the app for the time range [start_date, end_date) on the same snapshot of
+    the data. The dates are parsed once and the aggregations run in parallel. Results are memoized per date range and
+    version of the data, and must not be modified.
+
+    Parameters
+    ----------
+    start_date
+        start date of the considered time period in the format YYYY-MM-DD.
+
+    end_date
+        end date of the considered time period in the format YYYY-MM-DD.
+
+    dataset
+        snapshot of the data, defaults to the current snapshot.
+
+    Returns
+    -------
+    A `RangeQuery` with the parts to whole, the counts per finding place, the time series of admitted seals (see
+    `create_adaptive_time_series`), and the distribution of the length of stay.
+    """
+    return _query_date_range(dataset or get_dataset(), start_date, end_date)
+
+
+def _parse_date_range(start_date: str, end_date: str) -> tuple:
+    """
+    Parses the time range [start_date, end_date) selected in the app to the maximal and the minimal date.
+    """
+    with metrics.stage("date_parsing"):
+        min_date = _to_datetime64(pd.to_datetime(start_date, format="%Y-%m-%d"))
+        max_date = _to_datetime64(pd.to_datetime(end_date, format="%Y-%m-%d"))
+    return max_date, min_date
+
+
+@_memoize_by_version(maxsize=QUERY_CACHE_SIZE)
+def _query_date_range(
+    dataset: RobDataset, start_date: str, end_date: str
+) -> RangeQuery:
+    """
+    Computes all aggregations displayed in the app for the time range [start_date, end_date) on `dataset`.
+    """
+    max_date, min_date = _parse_date_range(start_date, end_date)
+    # Partitions outside of the time range are not loaded
+    futures = [
+        metrics.submit(_QUERY_POOL, query, dataset, max_date, min_date)
+        for query in (
+            _part_to_whole,
+            _bubbles,
+            _query_adaptive_time_series,
+            _length_of_stay,
+        )
+    ]
+    return RangeQuery(*(future.result() for future in futures))
+
+
+class IndexedQueryBackend(query_backends.QueryBackend):
+    """
+    Default backend computing the aggregations from the status intervals, the weekly cube, and the location index of
+    the dataset, which are built once per version of the data.
+    """
+
+    name = "indexed"
+
+    def part_to_whole(self, dataset, max_date, min_date):
+        return _query_part_to_whole(dataset, max_date, min_date)
+
+    def time_series(self, dataset, max_date, min_date):
+        return _query_time_series(dataset, max_date, min_date)
+
+    def bubbles(self, dataset, max_date, min_date):
+        return _query_bubbles(dataset, max_date, min_date)
+
+
+def set_query_backend(name: str) -> query_backends.QueryBackend:
+    """
+    Selects the engine computing the aggregations of the charts and the exports. Results of the previous backend are
+    discarded. The clusters of the bubble map and the length of stay are always computed from indexes.
+
+    Parameters
+    ----------
+    name
+        "indexed", "pandas", or "duckdb" (requires the duckdb package). The indexed backend is used instead of an
+        unknown or unavailable backend.
+
+    Returns
+    -------
+    The selected `QueryBackend`.
+    """
+    global _QUERY_BACKEND
+    backend = IndexedQueryBackend()
+    if name != backend.name:
+        try:
+            backend = query_backends.BACKENDS[name]()
+        except KeyError:
+            print(
+                f"There is no query backend named '{name}'. Using the indexed backend."
+            )
+        except ImportError as error:
+            print(f"{error} Using the indexed backend.")
+    _QUERY_BACKEND = backend
+    _query_date_range.cache_clear()
+    return backend
+
+
+set_query_backend(QUERY_BACKEND)
 
 
 if __name__ == "__main__":
     b = create_bubbles()
     t = create_time_series()
+    # All partitions of the partitioned layout in one snapshot
+    datasets = _datasets_for_range(
+        get_dataset(), _to_datetime64("2262-01-01"), _to_datetime64("1678-01-01")
+    )
+    dataset_all = datasets[0]
+    if len(datasets) > 1:
+        dataset_all = _build_dataset(
+            pd.concat([partition.df for partition in datasets], ignore_index=True),
+            "all",
+        )
+    df_rob = dataset_all.df
     print("Sanity checks")
-    print(DF_ROB["Sys_id"].unique().size)
+    print(df_rob["Sys_id"].unique().size)
     print(b["Anzahl"].sum())
     print(t["Anzahl"].sum())
+
+    # All backends must agree with the reference backend on the data in its original representation
+    reference = query_backends.PandasQueryBackend()
+    dataset_reference = dataset_all._replace(
+        df=df_rob.astype(
+            {
+                "Sys_id": "object",
+                "Fundort": "object",
+                "Tierart": "object",
+                "Aktuell": "object",
+                "Long": "float64",
+                "Lat": "float64",
+            }
+        )
+    )
+    backends = [IndexedQueryBackend.name]
+    for name, backend_class in query_backends.BACKENDS.items():
+        try:
+            backend_class()
+            backends.append(name)
+        except ImportError as error:
+            print(f"{error} Skipping its parity checks.")
+    date_ranges = [(pd.to_datetime("today"), pd.to_datetime("1990-04-30"))]
+    date_ranges += [
+        (pd.Timestamp(year + 1, 1, 1), pd.Timestamp(year, 1, 1))
+        for year in range(
+            df_rob["Einlieferungsdatum"].min().year,
+            df_rob["Erstellt_am"].max().year + 1,
+        )
+    ]
+    date_ranges += [
+        (max_date, pd.to_datetime("1990-04-30"))
+        for max_date in pd.date_range(
+            df_rob["Erstellt_am"].min(), df_rob["Erstellt_am"].max(), periods=10
+        )
+    ]
+    for backend in backends:
+        set_query_backend(backend)
+        for max_date, min_date in date_ranges:
+            pd.testing.assert_series_equal(
+                create_part_to_whole(max_date=max_date, min_date=min_date).sort_index(),
+                reference.part_to_whole(
+                    dataset_reference, max_date, min_date
+                ).sort_index(),
+                check_index_type=False,
+                check_categorical=False,
+            )
+            # The row labels depend on the backend and the loaded partitions
+            df_time_series = create_time_series(
+                max_date=max_date, min_date=min_date
+            ).reset_index(drop=True)
+            pd.testing.assert_frame_equal(
+                df_time_series,
+                reference.time_series(dataset_reference, max_date, min_date),
+                check_dtype=False,
+                check_categorical=False,
+            )
+            # Binning or downsampling long time ranges must not change the total count per `Tierart`
+            for downsampling in ("bins", "lttb"):
+                pd.testing.assert_series_equal(
+                    create_adaptive_time_series(
+                        max_date=max_date, min_date=min_date, downsampling=downsampling
+                    )
+                    .groupby("Tierart", observed=True)["Anzahl"]
+                    .sum(),
+                    df_time_series.groupby("Tierart", observed=True)["Anzahl"].sum(),
+                    check_index_type=False,
+                    check_categorical=False,
+                )
+            pd.testing.assert_frame_equal(
+                create_bubbles(max_date=max_date, min_date=min_date),
+                reference.bubbles(dataset_reference, max_date, min_date),
+                check_dtype=False,
+                check_categorical=False,
+            )
+    set_query_backend(QUERY_BACKEND)
+    for max_date, min_date in date_ranges:
+        pd.testing.assert_frame_equal(
+            create_length_of_stay(max_date=max_date, min_date=min_date),
+            _length_of_stay_reference(dataset_reference.df, max_date, min_date),
+            check_dtype=False,
+        )
+        # Clusters must keep the total count, and every finding place is a bubble of its own in detail
+        start_date, end_date = str(min_date.date()), str(max_date.date())
+        df_bubbles = create_bubbles(
+            max_date=pd.Timestamp(end_date), min_date=pd.Timestamp(start_date)
+        )
+        for zoom in (0, 4, 6.5, BUBBLES_DETAIL_ZOOM - 1):
+            assert (
+                query_bubble_clusters(start_date, end_date, bubble_viewport(zoom))[
+                    "Anzahl"
+                ].sum()
+                == df_bubbles["Anzahl"].sum()
+            )
+        pd.testing.assert_frame_equal(
+            query_bubble_clusters(
+                start_date, end_date, bubble_viewport(BUBBLES_DETAIL_ZOOM)
+            ),
+            df_bubbles,
+            check_dtype=False,
+            check_categorical=False,
+        )
+
+    # Callers may modify the results of the public functions without changing later results
+    total = create_time_series()["Anzahl"].sum()
+    df_time_series = create_time_series()
+    df_time_series["Anzahl"] *= 100
+    assert create_time_series()["Anzahl"].sum() == total
+
+    # Both readers keep the wall time of timestamps with UTC offsets, also if the offsets differ
+    rob_csv = (
+        "Sys_id,Fundort,Lat,Long,Einlieferungsdatum,Tierart,Aktuell,Erstellt_am,Sys_aktualisiert_am,Sys_hash\n"
+        "7,Amrum,54.6677,8.33346,2020-05-30,Seehund,Reha,2020-06-01T10:00:00+02:00,2020-06-01T10:00:00+02:00,h\n"
+        "7,Amrum,54.6677,8.33346,2020-05-30,Seehund,Ausgewildert,2020-11-02T10:00:00+01:00,2020-11-02T10:00:00Z,h\n"
+    ).encode("utf-8")
+    df_arrow = _read_rob_csv(io.BytesIO(rob_csv))
+    df_pandas = _read_rob_csv_with_pandas(io.BytesIO(rob_csv))
+    for column in _ROB_TIMESTAMP_COLUMNS:
+        pd.testing.assert_series_equal(df_arrow[column], df_pandas[column])
+    assert df_arrow["Erstellt_am"].tolist() == [
+        pd.Timestamp("2020-06-01 10:00"),
+        pd.Timestamp("2020-11-02 10:00"),
+    ]
+    # Numeric `Sys_id`s are stored in the narrowest integer type
+    assert _compact_rob(df_arrow)["Sys_id"].dtype == np.int8
+    print("Parity checks passed for the backends: {}".format(", ".join(backends)))
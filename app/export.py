@@ -0,0 +1,122 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Number of rows that are converted and sent at once, see `iter_csv` and `iter_parquet`
+EXPORT_CHUNK_ROWS = int(os.environ.get("ROB_EXPORT_CHUNK_ROWS", "50000"))
+
+# Media types of the export formats
+FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _chunks(parts: list, chunk_rows: int):
+    """
+    Yields the rows of the parts, i.e., pairs of a `pandas DataFrame` and the positions of its rows (all rows if
+    `None`), in chunks of at most `chunk_rows` rows. Only one chunk is copied at a time.
+    """
+    for df, rows in parts:
+        n_rows = len(df) if rows is None else rows.size
+        for start in range(0, n_rows, chunk_rows):
+            if rows is None:
+                yield df.iloc[start : start + chunk_rows]
+            else:
+                yield df.take(rows[start : start + chunk_rows])
+
+
+def iter_csv(parts: list, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """
+    Converts data to CSV in chunks, e.g., for a streamed response.
+
+    Parameters
+    ----------
+    parts
+        non-empty list of pairs of a `pandas DataFrame` with the same columns and the positions of its rows to be
+        exported (`None` for all rows), e.g., one pair per partition of the data.
+
+    chunk_rows
+        number of rows per chunk.
+
+    Returns
+    -------
+    A generator of the CSV file in chunks of bytes. The header is sent even if there are no rows.
+    """
+    yield parts[0][0].iloc[:0].to_csv(index=False).encode("utf-8")
+    for df_chunk in _chunks(parts, chunk_rows):
+        yield df_chunk.to_csv(index=False, header=False).encode("utf-8")
+
+
+class _ChunkSink:
+    """
+    Write-only file that collects the bytes written to it until they are taken, so a Parquet file can be sent while it
+    is written.
+    """
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet(parts: list, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """
+    Converts data to Parquet with one row group per chunk, e.g., for a streamed response.
+
+    Parameters
+    ----------
+    parts
+        non-empty list of pairs of a `pandas DataFrame` with the same columns and the positions of its rows to be
+        exported (`None` for all rows), e.g., one pair per partition of the data.
+
+    chunk_rows
+        number of rows per chunk.
+
+    Returns
+    -------
+    A generator of the Parquet file in chunks of bytes.
+    """
+    # Text columns are written as strings, since categoricals would repeat all their categories in every row group and
+    # Parquet dictionary-encodes strings anyway. A fixed schema also covers chunks with missing values only, and the
+    # types of the parts are promoted to a common type, e.g., integers of different widths.
+    df = pd.concat([df_part.iloc[:0] for df_part, _ in parts])
+    text_columns = [
+        column
+        for column in df.columns
+        if df[column].dtype == object
+        or isinstance(df[column].dtype, pd.CategoricalDtype)
+    ]
+    schema = pa.Schema.from_pandas(
+        df.astype({column: "string" for column in text_columns}),
+        preserve_index=False,
+    )
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for df_chunk in _chunks(parts, chunk_rows):
+            writer.write_table(
+                pa.Table.from_pandas(df_chunk, schema=schema, preserve_index=False)
+            )
+            yield sink.take()
+    yield sink.take()
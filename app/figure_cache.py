@@ -0,0 +1,169 @@
+import hashlib
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class FigureCache(ABC):
+    """
+    Size-bounded cache of serialized figures with least-recently-used eviction. Keys are tuples of strings, e.g., the
+    version of the data and the selected date range.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        """
+        Looks up a serialized figure.
+
+        Parameters
+        ----------
+        key
+            key of the figure.
+
+        Returns
+        -------
+        The serialized figure, or `None` if it is not cached.
+        """
+        payload = self._get(key)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return payload
+
+    @abstractmethod
+    def put(self, key: tuple, payload: str):
+        """
+        Stores a serialized figure and evicts the least recently used figures if the cache exceeds its size.
+
+        Parameters
+        ----------
+        key
+            key of the figure.
+
+        payload
+            serialized figure.
+        """
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """
+        Returns the number of hits, misses, and cached entries, and the size of the cache in bytes.
+        """
+
+    @abstractmethod
+    def _get(self, key: tuple):
+        """
+        Looks up a serialized figure without counting the lookup, see `get`.
+        """
+
+
+class MemoryFigureCache(FigureCache):
+    """
+    `FigureCache` in the memory of the current process.
+    """
+
+    def __init__(self, max_bytes: int):
+        super().__init__(max_bytes)
+        self._payloads = OrderedDict()
+        self._n_bytes = 0
+
+    def _get(self, key: tuple):
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is not None:
+                self._payloads.move_to_end(key)
+            return payload
+
+    def put(self, key: tuple, payload: str):
+        with self._lock:
+            if key in self._payloads:
+                self._n_bytes -= len(self._payloads.pop(key))
+            self._payloads[key] = payload
+            self._n_bytes += len(payload)
+            while self._n_bytes > self.max_bytes and len(self._payloads) > 1:
+                self._n_bytes -= len(self._payloads.popitem(last=False)[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._payloads),
+                "bytes": self._n_bytes,
+            }
+
+
+class FileFigureCache(FigureCache):
+    """
+    `FigureCache` in a directory, so it can be shared by all worker processes on a machine. The modification time of a
+    file is its last access time.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        super().__init__(max_bytes)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: tuple) -> str:
+        return os.path.join(
+            self.directory,
+            hashlib.sha256("\x1f".join(key).encode("utf-8")).hexdigest() + ".json",
+        )
+
+    def _get(self, key: tuple):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as payload_file:
+                payload = payload_file.read()
+            os.utime(path)
+        except OSError:
+            # The file is missing or has been evicted by another process in the meantime
+            return None
+        return payload
+
+    def _entries(self) -> list:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def put(self, key: tuple, payload: str):
+        path = self._path(key)
+        tmp_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+        with open(tmp_path, "w", encoding="utf-8") as payload_file:
+            payload_file.write(payload)
+        os.replace(tmp_path, path)
+
+        entries = sorted(self._entries())
+        n_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry_path in entries[:-1]:
+            if n_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+            n_bytes -= size
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+            }
@@ -0,0 +1,228 @@
+import glob
+import gzip
+import hashlib
+import os
+import threading
+
+from dash.fingerprint import check_fingerprint
+from flask import Response, g, request
+
+try:
+    import brotli
+except ImportError:
+    # Brotli is optional, responses are compressed with gzip only without it
+    brotli = None
+
+# Responses with fewer bytes are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.environ.get("ROB_COMPRESSION_MIN_BYTES", "1024"))
+# Compression level of gzip (1 to 9), the quality of brotli is mapped from it
+COMPRESSION_LEVEL = int(os.environ.get("ROB_COMPRESSION_LEVEL", "6"))
+# Time in seconds for which browsers may cache static files that are requested with their fingerprint, see `static_url`
+STATIC_MAX_AGE = int(os.environ.get("ROB_STATIC_MAX_AGE", str(365 * 24 * 3600)))
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(APP_DIR, "static")
+_COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def _code_version() -> str:
+    """
+    Hashes the source code of the app, since the responses depend on it as well as on the data.
+    """
+    code_hash = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(APP_DIR, "*.py"))):
+        with open(path, "rb") as source_file:
+            code_hash.update(source_file.read())
+    return code_hash.hexdigest()
+
+
+_CODE_VERSION = _code_version()
+_STATIC_FINGERPRINTS = {}
+# Compressed bodies of static files and Dash component suites by file, ETag, and encoding, see `_compress`
+_COMPRESSED_ASSETS = {}
+_COUNTERS = {
+    "rob_http_not_modified_total": 0,
+    "rob_http_compressed_responses_total": 0,
+    "rob_http_compression_cache_hits_total": 0,
+    "rob_http_uncompressed_bytes_total": 0,
+    "rob_http_compressed_bytes_total": 0,
+}
+_LOCK = threading.Lock()
+
+
+def static_url(path: str) -> str:
+    """
+    Returns the URL of a static file with the fingerprint of its content, so browsers may cache it for
+    `STATIC_MAX_AGE` seconds and still load a changed file right away.
+
+    Parameters
+    ----------
+    path
+        path of the file relative to the static directory of the app, e.g., "img/Seehundheader2.png".
+
+    Returns
+    -------
+    The URL of the file.
+    """
+    if path not in _STATIC_FINGERPRINTS:
+        with open(os.path.join(STATIC_DIR, *path.split("/")), "rb") as static_file:
+            _STATIC_FINGERPRINTS[path] = hashlib.sha256(static_file.read()).hexdigest()
+    return "/static/{}?v={}".format(path, _STATIC_FINGERPRINTS[path][:12])
+
+
+def _is_payload() -> bool:
+    """
+    Returns whether the current request asks for the output of a callback or for the layout.
+    """
+    return (
+        request.method == "POST" and request.path.endswith("/_dash-update-component")
+    ) or (request.method == "GET" and request.path.endswith("/_dash-layout"))
+
+
+def _is_asset(server) -> bool:
+    """
+    Returns whether the current request asks for a static file or a Dash component suite, whose body only changes
+    with its ETag or its path.
+    """
+    return (
+        request.path.startswith(server.static_url_path + "/")
+        or "/_dash-component-suites/" in request.path
+    )
+
+
+def _etag(version: str) -> str:
+    """
+    Derives the ETag of a request for the layout from the version of the data, the source code of the app, and the
+    path. Returns `None` for all other requests, including callbacks, since browsers do not revalidate POST requests
+    with `If-None-Match`.
+    """
+    if not (request.method == "GET" and request.path.endswith("/_dash-layout")):
+        return None
+    etag_hash = hashlib.sha256()
+    for part in (_CODE_VERSION.encode(), version.encode(), request.path.encode()):
+        etag_hash.update(part + b"\x1f")
+    return etag_hash.hexdigest()
+
+
+def _count(name: str, value: int = 1):
+    with _LOCK:
+        _COUNTERS[name] += value
+
+
+def counters() -> dict:
+    """
+    Returns the number of responses answered with 304 (Not Modified), the number of compressed responses, their bytes
+    before and after compression, and the number of assets whose compressed body was taken from the cache.
+    """
+    with _LOCK:
+        return dict(_COUNTERS)
+
+
+def _compress_data(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=min(COMPRESSION_LEVEL + 2, 11))
+    return gzip.compress(data, compresslevel=COMPRESSION_LEVEL)
+
+
+def _compress(response: Response, is_asset: bool) -> Response:
+    """
+    Compresses the body of a response with brotli or gzip, depending on the encodings accepted by the client. Assets,
+    i.e., static files and Dash component suites of several MB, are compressed once per file, ETag, and encoding, all
+    other responses but the outputs of callbacks and the layout are sent uncompressed.
+    """
+    accepted = request.accept_encodings
+    if (
+        not (is_asset or _is_payload())
+        or response.status_code != 200
+        or (response.is_streamed and not response.direct_passthrough)
+        or "Content-Encoding" in response.headers
+        or not response.mimetype.startswith(_COMPRESSIBLE_TYPES)
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    if brotli is not None and accepted["br"]:
+        encoding = "br"
+    elif accepted["gzip"]:
+        encoding = "gzip"
+    else:
+        return response
+    # Static files are passed through as file objects unless their body is read
+    response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_BYTES:
+        return response
+    etag, is_weak = response.get_etag()
+    if is_asset:
+        # Dash serves a component suite under any fingerprint, so the fingerprint is not part of the key. Fingerprinted
+        # component suites have no ETag, but their files do not change while the app is running.
+        key = (check_fingerprint(request.path)[0], etag, encoding)
+        with _LOCK:
+            compressed = _COMPRESSED_ASSETS.get(key)
+        if compressed is None:
+            compressed = _compress_data(data, encoding)
+            with _LOCK:
+                _COMPRESSED_ASSETS[key] = compressed
+        else:
+            _count("rob_http_compression_cache_hits_total")
+    else:
+        compressed = _compress_data(data, encoding)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        # Strong ETags differ per encoding
+        response.set_etag("{}-{}".format(etag, encoding), weak=is_weak)
+    _count("rob_http_compressed_responses_total")
+    _count("rob_http_uncompressed_bytes_total", len(data))
+    _count("rob_http_compressed_bytes_total", len(compressed))
+    return response
+
+
+def install(server, get_version):
+    """
+    Adds ETags, 304 (Not Modified) responses, compression, and cache headers for static files to a Flask server.
+    The layout gets a strong ETag derived from the version of the data, so a request with a matching `If-None-Match`
+    header is answered with 304 before the layout is built. Callback responses are only compressed, since browsers do
+    not revalidate POST requests.
+
+    Parameters
+    ----------
+    server
+        Flask server of the Dash app.
+
+    get_version
+        function returning the version of the data, or `None` while the data is loading, in which case no ETags are
+        issued.
+    """
+
+    @server.before_request
+    def _answer_not_modified():
+        version = get_version()
+        g.rob_etag = None if version is None else _etag(version)
+        if g.rob_etag is None:
+            return None
+        # The ETags of compressed responses carry the encoding as suffix
+        for candidate in request.if_none_match.as_set():
+            if candidate.rsplit("-", 1)[0] == g.rob_etag or candidate == g.rob_etag:
+                _count("rob_http_not_modified_total")
+                response = Response(status=304)
+                response.set_etag(candidate)
+                return response
+        return None
+
+    @server.after_request
+    def _finish_response(response: Response) -> Response:
+        if response.status_code == 200 and g.get("rob_etag"):
+            response.set_etag(g.rob_etag)
+        if request.path.startswith(server.static_url_path + "/") and request.args.get(
+            "v"
+        ):
+            response.cache_control.public = True
+            response.cache_control.max_age = STATIC_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return _compress(response, _is_asset(server))
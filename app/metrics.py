@@ -0,0 +1,258 @@
+import contextvars
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Requests taking at least this many seconds are logged with the duration of their stages, `0` disables the log
+SLOW_REQUEST_SECONDS = float(os.environ.get("ROB_SLOW_REQUEST_SECONDS", "1"))
+# Whether the peak memory of every callback is traced, which slows down the app considerably
+TRACEMALLOC = os.environ.get("ROB_METRICS_TRACEMALLOC") == "1"
+
+DURATION_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BYTES_BUCKETS = tuple(2**exponent for exponent in range(10, 27, 2))
+
+
+class Histogram:
+    """
+    Histogram with one label in the Prometheus text format, e.g., of the duration per function.
+    """
+
+    def __init__(self, name: str, description: str, label: str, buckets: tuple):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_value: str):
+        """
+        Records an observation.
+
+        Parameters
+        ----------
+        value
+            observed value, e.g., a duration in seconds.
+
+        label_value
+            value of the label of the histogram, e.g., the name of the function.
+        """
+        with self._lock:
+            if label_value not in self._values:
+                self._values[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            bucket_counts, _, _ = observations = self._values[label_value]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    bucket_counts[i] += 1
+            observations[1] += value
+            observations[2] += 1
+
+    def render(self) -> list:
+        """
+        Returns the lines of the histogram in the Prometheus text format.
+        """
+        lines = [
+            "# HELP {} {}".format(self.name, self.description),
+            "# TYPE {} histogram".format(self.name),
+        ]
+        with self._lock:
+            values = sorted(
+                (label_value, list(bucket_counts), total, count)
+                for label_value, (bucket_counts, total, count) in self._values.items()
+            )
+        for label_value, bucket_counts, total, count in values:
+            labels = '{}="{}"'.format(self.label, label_value)
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(
+                    '{}_bucket{{{},le="{}"}} {}'.format(
+                        self.name, labels, bound, bucket_count
+                    )
+                )
+            lines.append(
+                '{}_bucket{{{},le="+Inf"}} {}'.format(self.name, labels, count)
+            )
+            lines.append("{}_sum{{{}}} {}".format(self.name, labels, total))
+            lines.append("{}_count{{{}}} {}".format(self.name, labels, count))
+        return lines
+
+
+FUNCTION_DURATION = Histogram(
+    "rob_function_duration_seconds",
+    "Duration of instrumented functions in seconds.",
+    "function",
+    DURATION_BUCKETS,
+)
+STAGE_DURATION = Histogram(
+    "rob_stage_duration_seconds",
+    "Duration of the stages of a request in seconds.",
+    "stage",
+    DURATION_BUCKETS,
+)
+CALLBACK_DURATION = Histogram(
+    "rob_callback_duration_seconds",
+    "Duration of Dash callbacks in seconds.",
+    "callback",
+    DURATION_BUCKETS,
+)
+PAYLOAD_BYTES = Histogram(
+    "rob_callback_payload_bytes",
+    "Size of the serialized output of Dash callbacks in bytes.",
+    "callback",
+    BYTES_BUCKETS,
+)
+PEAK_MEMORY_BYTES = Histogram(
+    "rob_callback_peak_memory_bytes",
+    "Peak memory traced during Dash callbacks in bytes (only with ROB_METRICS_TRACEMALLOC=1).",
+    "callback",
+    BYTES_BUCKETS,
+)
+_HISTOGRAMS = (
+    CALLBACK_DURATION,
+    STAGE_DURATION,
+    FUNCTION_DURATION,
+    PAYLOAD_BYTES,
+    PEAK_MEMORY_BYTES,
+)
+
+# Durations of the stages of the current request, collected across the threads working on it
+_TRACE = contextvars.ContextVar("rob_trace", default=None)
+
+if TRACEMALLOC:
+    tracemalloc.start()
+
+
+def _record_stage(name: str, duration: float):
+    STAGE_DURATION.observe(duration, name)
+    trace = _TRACE.get()
+    if trace is not None:
+        trace.append((name, duration))
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Context manager that records the duration of a stage of a request, i.e., "date_parsing", "filtering",
+    "aggregation", "figure_construction", or "json_serialization".
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_stage(name, time.perf_counter() - start)
+
+
+def instrument(stage_name: str = None):
+    """
+    Decorator that records the duration of every call of a function and, if `stage_name` is given, also as duration of
+    this stage of the current request.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                FUNCTION_DURATION.observe(duration, function.__name__)
+                if stage_name is not None:
+                    _record_stage(stage_name, duration)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_callback(function):
+    """
+    Decorator for Dash callbacks that records their duration, the durations of their stages, and optionally their peak
+    memory, and logs slow requests. The peak memory includes the allocations of concurrent requests.
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        trace = []
+        token = _TRACE.set(trace)
+        if TRACEMALLOC:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            _TRACE.reset(token)
+            CALLBACK_DURATION.observe(duration, function.__name__)
+            if TRACEMALLOC:
+                PEAK_MEMORY_BYTES.observe(
+                    tracemalloc.get_traced_memory()[1], function.__name__
+                )
+            if 0 < SLOW_REQUEST_SECONDS <= duration:
+                stages = {}
+                for name, stage_duration in trace:
+                    stages[name] = stages.get(name, 0.0) + stage_duration
+                print(
+                    "Slow request: {}{} took {:.3f} s ({})".format(
+                        function.__name__,
+                        args,
+                        duration,
+                        ", ".join(
+                            "{} {:.3f} s".format(name, stage_duration)
+                            for name, stage_duration in stages.items()
+                        ),
+                    ),
+                    flush=True,
+                )
+
+    return wrapper
+
+
+def submit(executor, function, *args):
+    """
+    Submits a function to a thread pool, such that the stages it records are attributed to the current request.
+    """
+    return executor.submit(contextvars.copy_context().run, function, *args)
+
+
+def render(counters: dict = None, gauges: dict = None) -> str:
+    """
+    Renders all histograms in the Prometheus text format.
+
+    Parameters
+    ----------
+    counters
+        further counters by name, e.g., the hits of the figure cache.
+
+    gauges
+        further gauges by name, e.g., the size of the figure cache.
+
+    Returns
+    -------
+    The metrics in the Prometheus text format.
+    """
+    lines = []
+    for histogram in _HISTOGRAMS:
+        lines += histogram.render()
+    for metric_type, metrics in (("counter", counters), ("gauge", gauges)):
+        for name, value in (metrics or {}).items():
+            lines.append("# TYPE {} {}".format(name, metric_type))
+            lines.append("{} {}".format(name, value))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+from typing import NamedTuple
+
+import pandas as pd
+
+# File listing all partitions of the partitioned layout with their statistics
+MANIFEST = "_manifest.json"
+
+
+class Partition(NamedTuple):
+    """
+    Parquet file with the data of all animals admitted in one year, as listed in the manifest.
+    """
+
+    year: int
+    file: str
+    checksum: str
+    rows: int
+    first_admission: str
+    last_created: str
+    last_updated: str
+
+
+def write_partitions(df_rob: pd.DataFrame, directory: str) -> list:
+    """
+    Writes the data as one Parquet file per year of `Einlieferungsdatum` and a manifest listing them. All versions of an
+    animal end up in the same partition, because its `Einlieferungsdatum` does not change. Rows without
+    `Einlieferungsdatum` are not written, since no date range selects them. The manifest is replaced last, so readers
+    never see partitions of a half-written layout in the manifest.
+
+    Parameters
+    ----------
+    df_rob
+        data about seals admitted to the Seehundstation Friedrichskoog.
+
+    directory
+        directory of the partitioned layout, e.g., a local directory that is synchronized with the S3-prefix.
+
+    Returns
+    -------
+    A list of the written `Partition`s.
+    """
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for year, df_partition in df_rob.groupby(df_rob["Einlieferungsdatum"].dt.year):
+        file = "Einlieferungsjahr={}.parquet".format(int(year))
+        path = os.path.join(directory, file)
+        df_partition.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        with open(path, "rb") as partition_file:
+            checksum = hashlib.sha256(partition_file.read()).hexdigest()
+        written.append(
+            Partition(
+                year=int(year),
+                file=file,
+                checksum=checksum,
+                rows=len(df_partition),
+                first_admission=df_partition["Einlieferungsdatum"].min().isoformat(),
+                last_created=df_partition["Erstellt_am"].max().isoformat(),
+                last_updated=df_partition["Sys_aktualisiert_am"].max().isoformat(),
+            )
+        )
+    manifest_path = os.path.join(directory, MANIFEST)
+    with open(manifest_path + ".tmp", "w") as manifest_file:
+        json.dump(
+            {"partitions": [partition._asdict() for partition in written]},
+            manifest_file,
+            indent=2,
+        )
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return written
+
+
+def parse_manifest(raw: bytes) -> tuple:
+    """
+    Parses the manifest of the partitioned layout.
+
+    Parameters
+    ----------
+    raw
+        content of the manifest.
+
+    Returns
+    -------
+    A tuple of the `Partition`s sorted by year.
+    """
+    return tuple(
+        sorted(
+            (Partition(**partition) for partition in json.loads(raw)["partitions"]),
+            key=lambda partition: partition.year,
+        )
+    )
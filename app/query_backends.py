@@ -0,0 +1,276 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    # DuckDB is optional, the DuckDB backend is unavailable without it
+    duckdb = None
+
+
+class QueryBackend:
+    """
+    Engine computing the aggregations displayed in the app for the time range [min_date, max_date) from a snapshot of
+    the data. All backends must return the same results, see the parity checks of `create_app_assets`.
+    """
+
+    name = None
+
+    def part_to_whole(
+        self, dataset, max_date: np.datetime64, min_date: np.datetime64
+    ) -> pd.Series:
+        """
+        Counts the statuses (`Aktuell`) at `max_date` of the animals admitted from `min_date` on.
+
+        Parameters
+        ----------
+        dataset
+            snapshot of the data.
+
+        max_date
+            maximal date.
+
+        min_date
+            minimal date.
+
+        Returns
+        -------
+        A `pandas Series` named "Aktuell" with the positive counts per status, sorted in descending order.
+        """
+        raise NotImplementedError
+
+    def time_series(
+        self, dataset, max_date: np.datetime64, min_date: np.datetime64
+    ) -> pd.DataFrame:
+        """
+        Counts the admitted seals per `Tierart` and week within the time range [min_date, max_date). Weeks end on
+        Mondays and are labeled by their last day.
+
+        Parameters
+        ----------
+        dataset
+            snapshot of the data.
+
+        max_date
+            maximal date.
+
+        min_date
+            minimal date.
+
+        Returns
+        -------
+        A `pandas DataFrame` with the columns "Tierart", "Einlieferungswoche", and "Anzahl" and the positive counts
+        only, sorted by `Tierart` and week.
+        """
+        raise NotImplementedError
+
+    def bubbles(
+        self, dataset, max_date: np.datetime64, min_date: np.datetime64
+    ) -> pd.DataFrame:
+        """
+        Counts the seals admitted within the time range [min_date, max_date) per finding place.
+
+        Parameters
+        ----------
+        dataset
+            snapshot of the data.
+
+        max_date
+            maximal date.
+
+        min_date
+            minimal date.
+
+        Returns
+        -------
+        A `pandas DataFrame` with the columns "Fundort", "Long", "Lat", and "Anzahl" and the positive counts only,
+        sorted by finding place.
+        """
+        raise NotImplementedError
+
+
+class PandasQueryBackend(QueryBackend):
+    """
+    Reference backend computing the aggregations with plain pandas operations on the raw data on every call.
+    """
+
+    name = "pandas"
+
+    def part_to_whole(self, dataset, max_date, min_date):
+        df_rob = dataset.df
+        df_time_slice = df_rob.loc[
+            (df_rob["Einlieferungsdatum"] >= min_date)
+            & (df_rob["Erstellt_am"] < max_date),
+            ["Erstellt_am", "Sys_id"],
+        ]
+        df_latest_by_id = (
+            df_time_slice.sort_values(by=["Sys_id", "Erstellt_am"])
+            .groupby(["Sys_id"], observed=True)
+            .last()
+        )
+        ds_part_to_whole = pd.merge(
+            df_latest_by_id,
+            df_rob,
+            how="left",
+            on=["Erstellt_am", "Sys_id"],
+        )["Aktuell"].value_counts()
+        # Statuses of categoricals are counted even if they do not occur
+        return ds_part_to_whole[ds_part_to_whole > 0]
+
+    def time_series(self, dataset, max_date, min_date):
+        df_rob = dataset.df
+        # Weeks starting before `min_date` may end after it
+        df_admissions = df_rob.loc[
+            (df_rob["Einlieferungsdatum"] > min_date - np.timedelta64(7, "D"))
+            & (df_rob["Einlieferungsdatum"] < max_date),
+            ["Sys_id", "Einlieferungsdatum", "Tierart"],
+        ]
+        df_time_series = (
+            df_admissions.drop_duplicates()
+            .groupby(
+                [
+                    "Tierart",
+                    pd.Grouper(key="Einlieferungsdatum", axis=0, freq="W-MON"),
+                ],
+                observed=True,
+            )
+            .count()
+            .reset_index()
+            .rename(
+                columns={"Einlieferungsdatum": "Einlieferungswoche", "Sys_id": "Anzahl"}
+            )
+            # Groups of categoricals are not returned in order
+            .sort_values(by=["Tierart", "Einlieferungswoche"], kind="mergesort")
+        )
+        return df_time_series[
+            (df_time_series["Einlieferungswoche"] >= min_date)
+            & (df_time_series["Einlieferungswoche"] < max_date)
+            & (df_time_series["Anzahl"] > 0)
+        ].reset_index(drop=True)
+
+    def bubbles(self, dataset, max_date, min_date):
+        df_rob = dataset.df
+        df_bubbles = df_rob.loc[
+            (df_rob["Einlieferungsdatum"] >= min_date)
+            & (df_rob["Einlieferungsdatum"] < max_date),
+            ["Sys_id", "Fundort", "Long", "Lat"],
+        ]
+        df_bubbles = (
+            df_bubbles.drop_duplicates()
+            .groupby(["Fundort", "Long", "Lat"], observed=True)
+            .count()
+            .reset_index()
+            .rename(columns={"Sys_id": "Anzahl"})
+            # Groups of categoricals are not returned in order
+            .sort_values(by=["Fundort", "Long", "Lat"], kind="mergesort")
+        )
+        return df_bubbles[df_bubbles["Anzahl"] > 0].reset_index(drop=True)
+
+
+_DUCKDB_PART_TO_WHOLE = """
+WITH latest AS (
+    SELECT Sys_id, max(Erstellt_am) AS Erstellt_am
+    FROM rob
+    WHERE Einlieferungsdatum >= $min_date AND Erstellt_am < $max_date AND Sys_id IS NOT NULL
+    GROUP BY Sys_id
+)
+SELECT rob.Aktuell, count(*) AS Anzahl
+FROM latest JOIN rob USING (Sys_id, Erstellt_am)
+WHERE rob.Aktuell IS NOT NULL
+GROUP BY rob.Aktuell
+ORDER BY Anzahl DESC, rob.Aktuell
+"""
+
+_DUCKDB_TIME_SERIES = """
+WITH admissions AS (
+    SELECT DISTINCT Sys_id, Einlieferungsdatum, Tierart
+    FROM rob
+    WHERE Einlieferungsdatum > $min_date - INTERVAL 7 DAY AND Einlieferungsdatum < $max_date
+        AND Tierart IS NOT NULL
+), weekly AS (
+    SELECT
+        Tierart,
+        date_trunc('day', Einlieferungsdatum)
+            + to_days(CAST((8 - isodow(Einlieferungsdatum)) % 7 AS INTEGER)) AS Einlieferungswoche,
+        count(Sys_id) AS Anzahl
+    FROM admissions
+    GROUP BY ALL
+)
+SELECT Tierart, Einlieferungswoche, Anzahl
+FROM weekly
+WHERE Einlieferungswoche >= $min_date AND Einlieferungswoche < $max_date AND Anzahl > 0
+ORDER BY Tierart, Einlieferungswoche
+"""
+
+_DUCKDB_BUBBLES = """
+WITH findings AS (
+    SELECT DISTINCT Sys_id, Fundort, Long, Lat
+    FROM rob
+    WHERE Einlieferungsdatum >= $min_date AND Einlieferungsdatum < $max_date
+)
+SELECT Fundort, Long, Lat, count(Sys_id) AS Anzahl
+FROM findings
+WHERE Fundort IS NOT NULL AND Long IS NOT NULL AND Lat IS NOT NULL
+GROUP BY ALL
+HAVING count(Sys_id) > 0
+ORDER BY Fundort, Long, Lat
+"""
+
+
+class DuckDBQueryBackend(QueryBackend):
+    """
+    Backend computing the aggregations with SQL queries of an in-process DuckDB database, which scans the columns of
+    the raw data in place and in parallel on every call. Requires the `duckdb` package.
+    """
+
+    name = "duckdb"
+
+    def __init__(self):
+        if duckdb is None:
+            raise ImportError("The DuckDB backend requires the duckdb package.")
+        self._connection = duckdb.connect(":memory:")
+        self._lock = threading.Lock()
+
+    def _query(self, sql: str, dataset, max_date, min_date) -> pd.DataFrame:
+        """
+        Runs a query on the raw data of `dataset`, which is available as table `rob`.
+        """
+        # Every thread needs a cursor of its own
+        with self._lock:
+            cursor = self._connection.cursor()
+        try:
+            cursor.register("rob", dataset.df)
+            return cursor.execute(
+                sql,
+                {
+                    "max_date": pd.Timestamp(max_date).to_pydatetime(),
+                    "min_date": pd.Timestamp(min_date).to_pydatetime(),
+                },
+            ).df()
+        finally:
+            cursor.close()
+
+    def part_to_whole(self, dataset, max_date, min_date):
+        df_part_to_whole = self._query(
+            _DUCKDB_PART_TO_WHOLE, dataset, max_date, min_date
+        )
+        return pd.Series(
+            df_part_to_whole["Anzahl"].to_numpy(),
+            index=pd.Index(df_part_to_whole["Aktuell"].astype(object)),
+            name="Aktuell",
+        ).rename_axis(None)
+
+    def time_series(self, dataset, max_date, min_date):
+        return self._query(_DUCKDB_TIME_SERIES, dataset, max_date, min_date)
+
+    def bubbles(self, dataset, max_date, min_date):
+        return self._query(_DUCKDB_BUBBLES, dataset, max_date, min_date)
+
+
+# Backends working on the raw data, the default backend working on the indexes is part of `create_app_assets`
+BACKENDS = {
+    PandasQueryBackend.name: PandasQueryBackend,
+    DuckDBQueryBackend.name: DuckDBQueryBackend,
+}
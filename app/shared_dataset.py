@@ -0,0 +1,221 @@
+import fcntl
+import json
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import compute as pa_compute
+
+# File pointing to the directory of the currently published version
+CURRENT = "CURRENT"
+# Number of published versions that are kept, so workers can still attach to a version that was replaced just now
+KEEP_VERSIONS = 2
+# Categoricals with more categories, e.g., `Sys_id`, are published as Arrow strings, since pandas copies the categories
+# of a categorical into Python strings in every worker, whereas Arrow strings stay memory-mapped
+MAX_CATEGORIES = 2**16
+# File with the fields that are neither numeric arrays nor data frames, e.g., the version of the data
+OBJECTS = "objects.json"
+# Text is read as Arrow strings, which are views on the memory-mapped file
+_TYPES_MAPPER = {pa.string(): pd.StringDtype("pyarrow")}.get
+
+
+def _is_named_tuple(cls) -> bool:
+    return isinstance(cls, type) and issubclass(cls, tuple) and hasattr(cls, "_fields")
+
+
+def _to_json(value):
+    """
+    Converts a field that is neither a numeric array nor a data frame, i.e., a scalar or an index or array of text, to
+    JSON.
+    """
+    if isinstance(value, pd.Index):
+        return {"index": value.tolist(), "name": value.name}
+    if isinstance(value, np.ndarray):
+        return {"array": value.tolist()}
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    raise TypeError(f"Fields of type {type(value).__name__} cannot be published.")
+
+
+def _from_json(value):
+    if isinstance(value, dict) and "index" in value:
+        return pd.Index(value["index"], dtype=object, name=value["name"])
+    if isinstance(value, dict):
+        return np.array(value["array"], dtype=object)
+    return value
+
+
+def _write_table(df: pd.DataFrame, path: str):
+    """
+    Writes a data frame to an Arrow IPC file. Categoricals with more than `MAX_CATEGORIES` categories are written as
+    strings.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for index, field in enumerate(table.schema):
+        if (
+            pa.types.is_dictionary(field.type)
+            and pa.types.is_string(field.type.value_type)
+            and len(df[field.name].cat.categories) > MAX_CATEGORIES
+        ):
+            table = table.set_column(
+                index, field.name, pa_compute.cast(table[field.name], pa.string())
+            )
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _write_fields(value: NamedTuple, path: str, prefix: str, objects: dict):
+    """
+    Writes the numeric arrays of a named tuple to NumPy files, its data frames to Arrow IPC files, and collects all
+    other fields in `objects` as JSON. Nested named tuples are written recursively.
+    """
+    for field in value._fields:
+        name = prefix + field
+        field_value = getattr(value, field)
+        if _is_named_tuple(type(field_value)):
+            _write_fields(field_value, path, name + ".", objects)
+        elif isinstance(field_value, np.ndarray) and field_value.dtype != object:
+            np.save(os.path.join(path, name + ".npy"), field_value)
+        elif isinstance(field_value, pd.DataFrame):
+            _write_table(field_value, os.path.join(path, name + ".arrow"))
+        else:
+            objects[name] = _to_json(field_value)
+
+
+def _read_fields(cls, path: str, prefix: str, objects: dict) -> NamedTuple:
+    """
+    Reads a named tuple of type `cls` written by `_write_fields`. Arrays and data frames are memory-mapped read-only,
+    except for the categories of categoricals and numeric columns with missing values, which are copied.
+    """
+    values = {}
+    for field in cls._fields:
+        name = prefix + field
+        field_type = cls.__annotations__.get(field)
+        if _is_named_tuple(field_type):
+            values[field] = _read_fields(field_type, path, name + ".", objects)
+        elif name in objects:
+            values[field] = _from_json(objects[name])
+        elif os.path.exists(os.path.join(path, name + ".npy")):
+            values[field] = np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+        else:
+            source = pa.memory_map(os.path.join(path, name + ".arrow"), "r")
+            # Text and numeric columns without missing values stay views on the memory-mapped file
+            values[field] = (
+                pa.ipc.open_file(source)
+                .read_all()
+                .to_pandas(split_blocks=True, types_mapper=_TYPES_MAPPER)
+            )
+    return cls(**values)
+
+
+def publish_dataset(dataset: NamedTuple, directory: str) -> str:
+    """
+    Writes a dataset to a new version directory in `directory` and atomically points `CURRENT` to it. Older versions
+    are removed except for the most recent ones; workers that have mapped them keep their open files.
+
+    Parameters
+    ----------
+    dataset
+        dataset to be published, i.e., a named tuple of arrays, data frames, nested named tuples, scalars, and indexes
+        or arrays of text.
+
+    directory
+        directory shared by all workers.
+
+    Returns
+    -------
+    The name of the published version directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = uuid.uuid4().hex
+    path = os.path.join(directory, name)
+    os.makedirs(path)
+    objects = {}
+    _write_fields(dataset, path, "", objects)
+    with open(os.path.join(path, OBJECTS), "w") as objects_file:
+        json.dump(objects, objects_file)
+
+    pointer = os.path.join(directory, CURRENT)
+    tmp_pointer = "{}.{}.tmp".format(pointer, name)
+    with open(tmp_pointer, "w") as pointer_file:
+        pointer_file.write(name)
+    os.replace(tmp_pointer, pointer)
+
+    versions = sorted(
+        (entry for entry in os.scandir(directory) if entry.is_dir()),
+        key=lambda entry: entry.stat().st_mtime_ns,
+        reverse=True,
+    )
+    for entry in versions[KEEP_VERSIONS:]:
+        if entry.name != name:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    return name
+
+
+def published_version(directory: str):
+    """
+    Returns the name of the currently published version directory, or `None` if nothing has been published yet.
+    """
+    try:
+        with open(os.path.join(directory, CURRENT)) as pointer_file:
+            return pointer_file.read().strip() or None
+    except OSError:
+        return None
+
+
+def attach_dataset(cls, directory: str):
+    """
+    Memory-maps the currently published dataset read-only, so its pages are shared by all workers on a machine.
+
+    Parameters
+    ----------
+    cls
+        named tuple type of the dataset.
+
+    directory
+        directory shared by all workers.
+
+    Returns
+    -------
+    A tuple of the dataset and the name of its version directory, or `(None, None)` if nothing has been published yet.
+    """
+    name = published_version(directory)
+    if name is None:
+        return None, None
+    path = os.path.join(directory, name)
+    try:
+        with open(os.path.join(path, OBJECTS)) as objects_file:
+            objects = json.load(objects_file)
+        return _read_fields(cls, path, "", objects), name
+    except FileNotFoundError:
+        if published_version(directory) == name:
+            raise
+        # The version has been removed in the meantime, because a newer version has been published
+        return attach_dataset(cls, directory)
+
+
+@contextmanager
+def exclusive(directory: str, blocking: bool = True):
+    """
+    Context manager that makes the current process the only one publishing to `directory`. It yields `True` once it
+    has succeeded, or `False` if `blocking` is `False` and another process is publishing.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "publish.lock"), "w") as lock_file:
+        try:
+            fcntl.flock(
+                lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            )
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,139 @@
+# Measures the parse time and the peak memory of reading `rob.csv` with the streaming Arrow reader and with the former
+# pandas reader, which downloads the whole file before parsing it. Run this script with
+# `python benchmarks/csv_ingestion.py --rows 1000000`.
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCHMARKS_DIR, os.pardir, "app")
+READERS = ("arrow", "pandas")
+
+
+class _Body:
+    """
+    Stand-in for the body of an S3-object, which can only be read.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        return self._stream.read(size)
+
+
+def _memory_kb() -> dict:
+    """
+    Reads the current (VmRSS) and peak (VmHWM) resident memory of the current process in kB from `/proc/self/status`.
+    Unlike `getrusage`, the peak is not inherited from the parent process.
+    """
+    usage = {}
+    with open("/proc/self/status") as status:
+        for line in status:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                usage[key] = int(value.split()[0])
+    return usage
+
+
+def _run_worker(reader: str, path: str):
+    """
+    Parses the CSV file at `path` like the app parses the body of the S3-object and prints the parse time and the
+    increase of the peak resident memory as JSON.
+    """
+    sys.path.insert(0, APP_DIR)
+    import create_app_assets
+
+    before_kb = _memory_kb()["VmRSS"]
+    start = time.perf_counter()
+    with open(path, "rb") as stream:
+        if reader == "arrow":
+            df_rob = create_app_assets._read_rob_csv(_Body(stream))
+        else:
+            df_rob = create_app_assets._read_rob_csv_with_pandas(
+                io.BytesIO(_Body(stream).read())
+            )
+    parse_s = time.perf_counter() - start
+    peak_kb = _memory_kb()["VmHWM"]
+    print(
+        json.dumps(
+            {
+                "reader": reader,
+                "rows": len(df_rob),
+                "parse_s": parse_s,
+                "peak_mb": (peak_kb - before_kb) / 1024,
+                "frame_mb": df_rob.memory_usage(deep=True).sum() / 2**20,
+            }
+        ),
+        flush=True,
+    )
+
+
+def measure(reader: str, path: str) -> dict:
+    """
+    Parses the CSV file at `path` with `reader` in a new process, so the peak memory of the readers is independent.
+
+    Parameters
+    ----------
+    reader
+        "arrow" for the streaming Arrow reader or "pandas" for the former pandas reader.
+
+    path
+        path of the CSV file.
+
+    Returns
+    -------
+    A dictionary with the number of rows, the parse time in seconds, the increase of the peak resident memory while
+    parsing, and the size of the parsed data in MiB.
+    """
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", reader, path],
+        stdout=subprocess.PIPE,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measures the parse time and the peak memory of reading rob.csv."
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="path of a JSON file for the results")
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        _run_worker(*args.worker)
+        return
+
+    from synthetic_rob import generate_rob, write_rob
+
+    results = []
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as data_dir:
+            path = write_rob(generate_rob(n_rows, args.seed), data_dir)
+            file_mb = os.path.getsize(path) / 2**20
+            for reader in READERS:
+                result = dict(file_mb=file_mb, **measure(reader, path))
+                print(
+                    "{rows:>9} rows ({file_mb:>7.1f} MiB) {reader:<7} parsed in {parse_s:>6.2f} s, peak memory "
+                    "{peak_mb:>7.1f} MiB, parsed data {frame_mb:>7.1f} MiB".format(
+                        **result
+                    )
+                )
+                results.append(result)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
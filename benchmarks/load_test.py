@@ -0,0 +1,452 @@
+# Replays the traffic of many concurrent visitors against the app and reports the throughput, the latency percentiles
+# per request, and the error rates. Every visitor loads the page like a browser, i.e., the page, the layout with the
+# initial charts, and the callbacks, and then changes the selected date range a few times. Run this script with
+# `python benchmarks/load_test.py --rows 100000 --concurrency 1 8 32`, which serves synthetic data with the development
+# server of the app in a separate process, or point `--url` to a running deployment, e.g., gunicorn with several
+# workers, to size the number of workers.
+
+import argparse
+import gzip
+import http.client
+import json
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+from datetime import date, timedelta
+
+from run_benchmarks import _update_figures_request
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCHMARKS_DIR, os.pardir, "app")
+
+# Widths of the randomly selected date ranges in days
+RANGE_WIDTHS = (7, 31, 91, 365, 1826)
+# Counters of the app that are reported after every run, see `/metrics`
+SERVER_COUNTERS = (
+    "rob_figure_cache_hits_total",
+    "rob_figure_cache_misses_total",
+    "rob_coalesced_computations_total",
+    "rob_superseded_requests_total",
+)
+
+
+def _serve(port: int):
+    """
+    Serves the app with its multi-threaded development server, like `python app/app.py` does.
+    """
+    sys.path.insert(0, APP_DIR)
+    import app
+    from werkzeug.serving import make_server
+
+    # Every request would be logged otherwise
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", port, app.app.server, threaded=True)
+    print("Serving on port {}".format(server.server_port), flush=True)
+    server.serve_forever()
+
+
+class _Client:
+    """
+    HTTP client of one visitor, which keeps its connection alive like a browser.
+    """
+
+    def __init__(self, url: str, timeout: float):
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.prefix = parsed.path.rstrip("/")
+        self.timeout = timeout
+        self._connection = None
+
+    def request(self, method: str, path: str, body: dict = None) -> tuple:
+        """
+        Sends a request and reads the whole response, which may be compressed with gzip like for a browser.
+
+        Returns
+        -------
+        A tuple of the status code (`None` if the request failed), the latency in seconds, and the uncompressed body.
+        """
+        headers = {"Accept-Encoding": "gzip"}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        start = time.perf_counter()
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout
+                )
+            try:
+                self._connection.request(
+                    method, self.prefix + path, body=data, headers=headers
+                )
+                response = self._connection.getresponse()
+                content = response.read()
+                latency = time.perf_counter() - start
+                if response.getheader("Connection", "").lower() == "close":
+                    self.close()
+                if response.getheader("Content-Encoding") == "gzip":
+                    content = gzip.decompress(content)
+                return response.status, latency, content
+            except (OSError, http.client.HTTPException):
+                self.close()
+                # A connection that was closed by the server while idle is opened again once
+                if attempt == 1:
+                    return None, time.perf_counter() - start, b""
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def _find_props(component, component_id: str):
+    """
+    Finds the properties of a component in the layout of the app, or returns `None` if it is not in the layout.
+    """
+    if isinstance(component, list):
+        for child in component:
+            props = _find_props(child, component_id)
+            if props is not None:
+                return props
+    elif isinstance(component, dict):
+        props = component.get("props", {})
+        if props.get("id") == component_id:
+            return props
+        return _find_props(props.get("children"), component_id)
+    return None
+
+
+def _random_date_range(rng: random.Random, first: date, last: date) -> tuple:
+    """
+    Draws a date range of one of `RANGE_WIDTHS` within [first, last).
+    """
+    width = timedelta(days=rng.choice(RANGE_WIDTHS))
+    span = max((last - first - width).days, 0)
+    start = first + timedelta(days=rng.randint(0, span))
+    return str(start), str(start + width)
+
+
+def _visit(client: _Client, rng: random.Random, changes: int, pool: list, record):
+    """
+    Loads the page like a browser and changes the selected date range `changes` times, drawn at random or from the
+    common `pool` of date ranges.
+    """
+    for name, path in (
+        ("page", "/"),
+        ("layout", "/_dash-layout"),
+        ("dependencies", "/_dash-dependencies"),
+    ):
+        status, latency, content = client.request("GET", path)
+        record(name, status, latency)
+        if status != 200:
+            return
+        if name == "layout":
+            layout = json.loads(content)
+    date_picker = _find_props(layout, "date-picker")
+    if date_picker is None:
+        # The data is still loading
+        return
+    # The browser generates the ID of its session, and the initial charts are part of the layout
+    session_id = uuid.uuid4().hex
+    start_date, end_date = date_picker["start_date"], date_picker["end_date"]
+    first, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    for _ in range(changes):
+        status, latency, _ = client.request(
+            "POST",
+            "/_dash-update-component",
+            _update_figures_request(
+                *rng.choice(pool) if pool else _random_date_range(rng, first, last),
+                session_id=session_id,
+            ),
+        )
+        record("update_figures (date change)", status, latency)
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    """
+    Returns the `q`-th percentile of sorted values with the nearest-rank method.
+    """
+    rank = math.ceil(q / 100 * len(sorted_values)) - 1
+    return sorted_values[min(max(rank, 0), len(sorted_values) - 1)]
+
+
+def _read_server_counters(url: str) -> dict:
+    """
+    Reads the counters of `SERVER_COUNTERS` from `/metrics` of the app, which cover one worker process only.
+    """
+    client = _Client(url, timeout=10)
+    status, _, content = client.request("GET", "/metrics")
+    client.close()
+    counters = {}
+    if status == 200:
+        for line in content.decode().splitlines():
+            name, _, value = line.partition(" ")
+            if name in SERVER_COUNTERS:
+                counters[name] = float(value)
+    return counters
+
+
+def run(
+    url: str,
+    concurrency: int,
+    duration: float,
+    changes: int,
+    pool_size: int,
+    seed: int,
+    timeout: float,
+) -> dict:
+    """
+    Lets `concurrency` visitors load the app one after another for `duration` seconds.
+
+    Parameters
+    ----------
+    url
+        URL of the app.
+
+    concurrency
+        number of concurrent visitors.
+
+    duration
+        duration of the run in seconds. Visits in progress are completed.
+
+    changes
+        number of changes of the date range per visit.
+
+    pool_size
+        number of date ranges that all visitors choose from, `0` draws a new date range for every change.
+
+    seed
+        seed of the random date ranges.
+
+    timeout
+        timeout of a request in seconds.
+
+    Returns
+    -------
+    A dictionary with the number of requests per second, and the number of requests, the error rate, and the latency
+    percentiles in milliseconds per kind of request.
+    """
+    latencies = {}
+    outcomes = {}
+    lock = threading.Lock()
+
+    def record(name: str, status: int, latency: float):
+        # Superseded requests are answered with 204 (No Content)
+        outcome = (
+            "ok" if status in (200, 304) else "skipped" if status == 204 else "error"
+        )
+        with lock:
+            latencies.setdefault(name, []).append(latency)
+            counts = outcomes.setdefault(name, {"ok": 0, "skipped": 0, "error": 0})
+            counts[outcome] += 1
+
+    pool_rng = random.Random(seed)
+    pool = []
+    if pool_size:
+        client = _Client(url, timeout)
+        status, _, content = client.request("GET", "/_dash-layout")
+        client.close()
+        date_picker = _find_props(json.loads(content), "date-picker")
+        first = date.fromisoformat(date_picker["start_date"])
+        last = date.fromisoformat(date_picker["end_date"])
+        pool = [_random_date_range(pool_rng, first, last) for _ in range(pool_size)]
+
+    deadline = time.perf_counter() + duration
+
+    def visitor(index: int):
+        rng = random.Random(seed * 1_000_003 + index)
+        client = _Client(url, timeout)
+        while time.perf_counter() < deadline:
+            _visit(client, rng, changes, pool, record)
+        client.close()
+
+    counters_before = _read_server_counters(url)
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=visitor, args=(index,), daemon=True)
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    counters_after = _read_server_counters(url)
+
+    requests = {}
+    for name, values in latencies.items():
+        values = sorted(values)
+        counts = outcomes[name]
+        requests[name] = dict(
+            count=len(values),
+            per_second=len(values) / elapsed,
+            error_rate=counts["error"] / len(values),
+            skipped=counts["skipped"],
+            p50_ms=1000 * _percentile(values, 50),
+            p95_ms=1000 * _percentile(values, 95),
+            p99_ms=1000 * _percentile(values, 99),
+            max_ms=1000 * values[-1],
+        )
+    n_requests = sum(len(values) for values in latencies.values())
+    return dict(
+        concurrency=concurrency,
+        duration_s=elapsed,
+        requests_per_second=n_requests / elapsed,
+        error_rate=sum(counts["error"] for counts in outcomes.values())
+        / max(n_requests, 1),
+        requests=requests,
+        server_counters={
+            name: counters_after[name] - counters_before.get(name, 0)
+            for name in counters_after
+        },
+    )
+
+
+def _start_server(data_dir: str, tmp_dir: str, port: int) -> subprocess.Popen:
+    """
+    Starts the app in a new process on the data in `data_dir` and waits until the data has been loaded.
+    """
+    env = dict(
+        os.environ,
+        ROB_LOCAL_DATA_DIR=os.path.abspath(data_dir),
+        ROB_CACHE_DIR=os.path.join(tmp_dir, "cache"),
+        ROB_REFRESH_INTERVAL="0",
+    )
+    for name in ("ROB_SHARED_DATASET_DIR", "ROB_FIGURE_CACHE_DIR", "ROB_OFFLINE"):
+        env.pop(name, None)
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port)],
+        env=env,
+    )
+    client = _Client("http://127.0.0.1:{}".format(port), timeout=10)
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("The app stopped before it had loaded the data.")
+            status, _, content = client.request("GET", "/_dash-layout")
+            if status == 200 and _find_props(json.loads(content), "date-picker"):
+                return server
+            time.sleep(0.5)
+    except BaseException:
+        server.terminate()
+        raise
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replays the traffic of concurrent visitors against the app."
+    )
+    parser.add_argument(
+        "--url",
+        help="URL of a running app instead of starting one, e.g., http://127.0.0.1:8050",
+    )
+    parser.add_argument(
+        "--data-dir",
+        help="directory mirroring the S3-bucket to use instead of synthetic data",
+    )
+    parser.add_argument(
+        "--rows", type=int, default=100_000, help="number of rows of the synthetic data"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 8, 32],
+        help="numbers of concurrent visitors, one run each",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="duration of a run in seconds"
+    )
+    parser.add_argument(
+        "--changes",
+        type=int,
+        default=5,
+        help="number of changes of the date range per visit",
+    )
+    parser.add_argument(
+        "--pool",
+        type=int,
+        default=0,
+        help="number of common date ranges to choose from, 0 draws a new one for every change",
+    )
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="path of a JSON file for the results")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        _serve(args.port)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server = None
+        url = args.url
+        if url is None:
+            data_dir = args.data_dir
+            if data_dir is None:
+                from synthetic_rob import generate_rob, write_rob
+
+                data_dir = os.path.join(tmp_dir, "data")
+                write_rob(generate_rob(args.rows, args.seed), data_dir)
+            server = _start_server(data_dir, tmp_dir, args.port)
+            url = "http://127.0.0.1:{}".format(args.port)
+        try:
+            runs = [
+                run(
+                    url,
+                    concurrency,
+                    args.duration,
+                    args.changes,
+                    args.pool,
+                    args.seed,
+                    args.timeout,
+                )
+                for concurrency in args.concurrency
+            ]
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    for run_results in runs:
+        print(
+            "{concurrency} concurrent visitors: {requests_per_second:.1f} requests/s, "
+            "error rate {error_rate:.2%}".format(**run_results)
+        )
+        for name, stats in run_results["requests"].items():
+            print(
+                "  {name:<30} {count:>7} requests {per_second:>8.1f}/s, p50 {p50_ms:>8.1f} ms, p95 {p95_ms:>8.1f} ms, "
+                "p99 {p99_ms:>8.1f} ms, errors {error_rate:.2%}, skipped {skipped}".format(
+                    name=name, **stats
+                )
+            )
+        if run_results["server_counters"]:
+            print(
+                "  "
+                + ", ".join(
+                    "{} {:.0f}".format(name, value)
+                    for name, value in run_results["server_counters"].items()
+                )
+            )
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(
+                dict(url=args.url, rows=args.rows, runs=runs), output_file, indent=2
+            )
+
+
+if __name__ == "__main__":
+    main()
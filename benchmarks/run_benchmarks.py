@@ -0,0 +1,431 @@
+# Times the aggregations and the figures of the app on synthetic data for different sizes of the data and widths of the
+# selected date range. Run this script with `python benchmarks/run_benchmarks.py --rows 10000 100000 --output
+# results.json`, and compare the results of two commits with `--compare <results of the other commit>`. With
+# `--partitioned`, the synthetic data is served from the year-partitioned layout. The aggregations are also timed for
+# every available query backend, e.g., "part_to_whole [duckdb]", while the app uses the backend selected by
+# `ROB_QUERY_BACKEND`.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCHMARKS_DIR, os.pardir, "app")
+
+# Widths of the selected date range in days, ending at the last update of the data; `None` is the default date range
+RANGE_WIDTHS = {"week": 7, "month": 31, "year": 365, "5 years": 1826, "all": None}
+# View of the bubble map after zooming into the North Frisian Islands, as reported by the map
+ZOOMED_MAP = {
+    "mapbox.center": {"lon": 8.6, "lat": 54.5},
+    "mapbox.zoom": 9.5,
+    "mapbox._derived": {
+        "coordinates": [[8.3, 54.7], [8.9, 54.7], [8.9, 54.3], [8.3, 54.3]]
+    },
+}
+
+
+def _time(function, repeats: int, setup=None) -> dict:
+    """
+    Calls `function` `repeats` times and returns the median and minimal duration in milliseconds. `setup` is called
+    before every call, e.g., to clear caches, and is not timed.
+    """
+    durations = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        durations.append(1000 * (time.perf_counter() - start))
+    return {
+        "median_ms": statistics.median(durations),
+        "min_ms": min(durations),
+    }
+
+
+def _update_figures_request(
+    start_date: str, end_date: str, relayout_data: dict = None, session_id: str = None
+) -> dict:
+    """
+    Builds the body of the request that the browser sends to update the charts for the time range
+    [start_date, end_date), or, if `relayout_data` is given, after the user has changed the view of the bubble map.
+    `session_id` is the ID of the browser session from the layout.
+    """
+    outputs = [
+        {"id": component_id, "property": "figure"}
+        for component_id in (
+            "fig-part-to-whole",
+            "fig-bubbles",
+            "fig-time-series",
+            "fig-length-of-stay",
+        )
+    ]
+    return {
+        "output": "..{}..".format(
+            "...".join("{id}.{property}".format(**output) for output in outputs)
+        ),
+        "outputs": outputs,
+        "inputs": [
+            {"id": "date-picker", "property": "start_date", "value": start_date},
+            {"id": "date-picker", "property": "end_date", "value": end_date},
+            {"id": "fig-bubbles", "property": "relayoutData", "value": relayout_data},
+        ],
+        "state": [{"id": "session-id", "property": "data", "value": session_id}],
+        "changedPropIds": [
+            "date-picker.start_date"
+            if relayout_data is None
+            else "fig-bubbles.relayoutData"
+        ],
+    }
+
+
+def _measure_wire_bytes(client, start_date: str, end_date: str) -> dict:
+    """
+    Measures the bytes on the wire of the response with all charts for the time range [start_date, end_date), i.e.,
+    uncompressed, compressed with gzip and brotli (`None` if unavailable), and of the 304 response to a repeated
+    request for the layout, since only the layout is revalidated with its ETag.
+    """
+    body = _update_figures_request(start_date, end_date)
+    response = client.post("/_dash-update-component", json=body)
+    wire_bytes = {"identity_bytes": len(response.data)}
+    for encoding in ("gzip", "br"):
+        encoded = client.post(
+            "/_dash-update-component", json=body, headers={"Accept-Encoding": encoding}
+        )
+        wire_bytes[encoding + "_bytes"] = (
+            len(encoded.data)
+            if encoded.headers.get("Content-Encoding") == encoding
+            else None
+        )
+    layout = client.get("/_dash-layout")
+    not_modified = client.get(
+        "/_dash-layout", headers={"If-None-Match": layout.headers.get("ETag", "")}
+    )
+    wire_bytes["not_modified_bytes"] = (
+        len(not_modified.data) if not_modified.status_code == 304 else None
+    )
+    return wire_bytes
+
+
+def _run_worker(repeats: int):
+    """
+    Loads the data like the app, times all benchmarks, and prints the results as JSON.
+    """
+    sys.path.insert(0, APP_DIR)
+    start = time.perf_counter()
+    import app
+    import create_app_assets
+    import pandas as pd
+    import query_backends
+
+    # Time from starting the app to its first response, i.e., the layout of the loading state, to the data being
+    # loaded, and to the first layout with the charts of the default date range
+    startup = {"import_s": time.perf_counter() - start}
+    client = app.app.server.test_client()
+    client.get("/_dash-layout")
+    startup["first_response_s"] = time.perf_counter() - start
+    summary = create_app_assets.summarize_dataset(create_app_assets.get_dataset())
+    startup["data_loaded_s"] = time.perf_counter() - start
+    default_start, default_end = app.default_date_range(summary)
+    client.get("/_dash-layout")
+    startup["first_figures_s"] = time.perf_counter() - start
+
+    # The figure cache is prewarmed in the background, which must not compete with the benchmarks
+    for thread in threading.enumerate():
+        if thread.name == "rob-prewarm":
+            thread.join()
+
+    last_update = summary.last_created.normalize() + pd.Timedelta(days=1)
+
+    def clear_caches():
+        create_app_assets._query_time_series.cache_clear()
+        create_app_assets._query_date_range.cache_clear()
+        create_app_assets._query_bubble_clusters.cache_clear()
+        create_app_assets._query_length_of_stay.cache_clear()
+        app.FIGURE_CACHE = app.MemoryFigureCache(app.FIGURE_CACHE_MAX_BYTES)
+
+    backends = [create_app_assets.IndexedQueryBackend()]
+    for backend_class in query_backends.BACKENDS.values():
+        try:
+            backends.append(backend_class())
+        except ImportError as error:
+            print(error, file=sys.stderr)
+
+    results = []
+    wire = []
+    for range_name, width in RANGE_WIDTHS.items():
+        if width is None:
+            min_date, max_date = (
+                pd.Timestamp(default_start),
+                pd.Timestamp(default_end),
+            )
+        else:
+            min_date, max_date = last_update - pd.Timedelta(days=width), last_update
+        start_date, end_date = str(min_date.date()), str(max_date.date())
+        range_query = create_app_assets.query_date_range(start_date, end_date)
+        benchmarks = {
+            "create_part_to_whole": (
+                lambda: create_app_assets.create_part_to_whole(max_date, min_date),
+                None,
+            ),
+            "create_time_series": (
+                lambda: create_app_assets.create_time_series(max_date, min_date),
+                clear_caches,
+            ),
+            "create_adaptive_time_series": (
+                lambda: create_app_assets.create_adaptive_time_series(
+                    max_date, min_date
+                ),
+                clear_caches,
+            ),
+            "create_bubbles": (
+                lambda: create_app_assets.create_bubbles(max_date, min_date),
+                None,
+            ),
+            "create_length_of_stay": (
+                lambda: create_app_assets.create_length_of_stay(max_date, min_date),
+                clear_caches,
+            ),
+            "build_fig_part_to_whole": (
+                lambda: app.build_fig_part_to_whole(range_query.part_to_whole),
+                None,
+            ),
+            "build_fig_bubbles": (
+                lambda: app.build_fig_bubbles(range_query.bubbles),
+                None,
+            ),
+            "build_fig_time_series": (
+                lambda: app.build_fig_time_series(range_query.time_series),
+                None,
+            ),
+            "build_fig_length_of_stay": (
+                lambda: app.build_fig_length_of_stay(range_query.length_of_stay),
+                None,
+            ),
+            "update_figures (cold)": (
+                lambda: app.update_figures(start_date, end_date),
+                clear_caches,
+            ),
+            "update_figures (cached)": (
+                lambda: app.update_figures(start_date, end_date),
+                None,
+            ),
+            "zoom bubble map (cold)": (
+                lambda: client.post(
+                    "/_dash-update-component",
+                    json=_update_figures_request(start_date, end_date, ZOOMED_MAP),
+                ),
+                clear_caches,
+            ),
+        }
+        for name, (function, setup) in benchmarks.items():
+            results.append(
+                dict(name=name, range=range_name, **_time(function, repeats, setup))
+            )
+        max_datetime64 = create_app_assets._to_datetime64(max_date)
+        min_datetime64 = create_app_assets._to_datetime64(min_date)
+        dataset = create_app_assets.get_dataset()
+        for backend in backends:
+            for aggregation, combine in (
+                ("part_to_whole", create_app_assets._combine_part_to_whole),
+                ("time_series", create_app_assets._combine_time_series),
+                ("bubbles", create_app_assets._combine_bubbles),
+            ):
+                function = getattr(backend, aggregation)
+                results.append(
+                    dict(
+                        name="{} [{}]".format(aggregation, backend.name),
+                        range=range_name,
+                        **_time(
+                            lambda: create_app_assets._query_partitions(
+                                function,
+                                combine,
+                                dataset,
+                                max_datetime64,
+                                min_datetime64,
+                            ),
+                            repeats,
+                            clear_caches,
+                        ),
+                    )
+                )
+        wire.append(
+            dict(range=range_name, **_measure_wire_bytes(client, start_date, end_date))
+        )
+    print(
+        json.dumps(dict(rows=summary.rows, benchmarks=results, wire=wire, **startup)),
+        flush=True,
+    )
+
+
+def run(data_dir: str, repeats: int) -> dict:
+    """
+    Times all benchmarks in a new process on the data in `data_dir`, so every run starts without cached data.
+
+    Parameters
+    ----------
+    data_dir
+        directory mirroring the S3-bucket.
+
+    repeats
+        number of calls per benchmark.
+
+    Returns
+    -------
+    A dictionary with the number of rows, the times from starting the app to its first responses in seconds, and the
+    durations of all benchmarks.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(
+            os.environ,
+            ROB_LOCAL_DATA_DIR=os.path.abspath(data_dir),
+            ROB_CACHE_DIR=os.path.join(tmp_dir, "cache"),
+            ROB_REFRESH_INTERVAL="0",
+        )
+        for name in ("ROB_SHARED_DATASET_DIR", "ROB_FIGURE_CACHE_DIR", "ROB_OFFLINE"):
+            env.pop(name, None)
+        output = subprocess.run(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--worker",
+                "--repeats",
+                str(repeats),
+            ],
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+            check=True,
+        ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCHMARKS_DIR,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict):
+    """
+    Prints the ratio of the median durations of `results` and `baseline` for all benchmarks they have in common.
+    """
+    baseline_durations = {
+        (run_results["rows"], benchmark["name"], benchmark["range"]): benchmark[
+            "median_ms"
+        ]
+        for run_results in baseline["runs"]
+        for benchmark in run_results["benchmarks"]
+    }
+    print(
+        "\nComparison with commit {} (ratio > 1 is slower)".format(baseline["commit"])
+    )
+    for run_results in results["runs"]:
+        for benchmark in run_results["benchmarks"]:
+            key = (run_results["rows"], benchmark["name"], benchmark["range"])
+            if key in baseline_durations:
+                print(
+                    "{:>9} rows {:<28} {:<8} {:>10.2f} ms {:>10.2f} ms {:>6.2f}x".format(
+                        *key,
+                        baseline_durations[key],
+                        benchmark["median_ms"],
+                        benchmark["median_ms"] / baseline_durations[key],
+                    )
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Times the aggregations and the figures of the app on synthetic data."
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000],
+        help="numbers of rows of the synthetic data, up to 10 million",
+    )
+    parser.add_argument(
+        "--data-dir",
+        help="directory mirroring the S3-bucket to use instead of synthetic data",
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--partitioned",
+        action="store_true",
+        help="serve the synthetic data from the year-partitioned layout",
+    )
+    parser.add_argument("--output", help="path of a JSON file for the results")
+    parser.add_argument("--compare", help="path of a JSON file with earlier results")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        _run_worker(args.repeats)
+        return
+
+    from synthetic_rob import generate_rob, write_partitioned_rob, write_rob
+
+    runs = []
+    if args.data_dir:
+        runs.append(run(args.data_dir, args.repeats))
+    else:
+        for n_rows in args.rows:
+            with tempfile.TemporaryDirectory() as data_dir:
+                df_rob = generate_rob(n_rows, args.seed)
+                write_rob(df_rob, data_dir)
+                if args.partitioned:
+                    write_partitioned_rob(df_rob, data_dir)
+                runs.append(run(data_dir, args.repeats))
+    for run_results in runs:
+        print(
+            "{rows} rows, first response after {first_response_s:.2f} s, data loaded after {data_loaded_s:.2f} s, "
+            "first charts after {first_figures_s:.2f} s".format(**run_results)
+        )
+        for benchmark in run_results["benchmarks"]:
+            print(
+                "  {name:<28} {range:<8} median {median_ms:>10.2f} ms, min {min_ms:>10.2f} ms".format(
+                    **benchmark
+                )
+            )
+        for wire_bytes in run_results["wire"]:
+            print(
+                "  bytes on the wire of all charts {range:<8} uncompressed {identity_bytes:>9}, gzip {gzip_bytes}, "
+                "brotli {br_bytes}, not modified layout {not_modified_bytes}".format(
+                    **wire_bytes
+                )
+            )
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeats": args.repeats,
+        "runs": runs,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(results, json.load(baseline_file))
+
+
+if __name__ == "__main__":
+    main()
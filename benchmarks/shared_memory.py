@@ -0,0 +1,123 @@
+# Measures the resident memory per worker process with private and with shared (memory-mapped) data. Run this script
+# with `python benchmarks/shared_memory.py --data-dir <dir>`, where <dir> mirrors the S3-bucket, i.e., contains
+# `data/deployment/rob.csv`.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "app")
+
+
+def _memory_usage() -> dict:
+    """
+    Reads the memory usage of the current process in kB from `/proc/self/smaps_rollup`. The proportional set size
+    (Pss) splits shared pages evenly between the processes sharing them.
+    """
+    usage = {}
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss", "Shared_Clean", "Private_Clean", "Private_Dirty"):
+                usage[key] = int(value.split()[0])
+    return usage
+
+
+def _run_worker():
+    """
+    Loads the data like a worker process of the app, touches all of it by querying the full date range, reports its
+    memory usage, and stays alive until its standard input is closed.
+    """
+    sys.path.insert(0, APP_DIR)
+    import create_app_assets
+
+    create_app_assets.query_date_range("1900-01-01", "2100-01-01")
+    # The raw data is touched as well, e.g., to compute the banner of the layout
+    create_app_assets.summarize_dataset()
+    print(json.dumps(_memory_usage()), flush=True)
+    sys.stdin.read()
+
+
+def measure(n_workers: int, env: dict) -> dict:
+    """
+    Starts `n_workers` worker processes at once and collects their memory usage.
+
+    Parameters
+    ----------
+    n_workers
+        number of worker processes.
+
+    env
+        environment variables of the worker processes.
+
+    Returns
+    -------
+    A dictionary with the mean Rss and Pss per worker and the total Pss of all workers in kB.
+    """
+    workers = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker"],
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(n_workers)
+    ]
+    usages = [json.loads(worker.stdout.readline()) for worker in workers]
+    for worker in workers:
+        worker.stdin.close()
+        worker.wait()
+    return {
+        "workers": n_workers,
+        "rss_kb_per_worker": sum(usage["Rss"] for usage in usages) / n_workers,
+        "pss_kb_per_worker": sum(usage["Pss"] for usage in usages) / n_workers,
+        "pss_kb_total": sum(usage["Pss"] for usage in usages),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measures the memory per worker process with private and shared data."
+    )
+    parser.add_argument("--data-dir", help="directory mirroring the S3-bucket")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--output", help="path of a JSON file for the results")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        _run_worker()
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(
+            os.environ,
+            ROB_LOCAL_DATA_DIR=os.path.abspath(args.data_dir),
+            ROB_CACHE_DIR=os.path.join(tmp_dir, "cache"),
+            ROB_REFRESH_INTERVAL="0",
+        )
+        env.pop("ROB_SHARED_DATASET_DIR", None)
+        shared_env = dict(env, ROB_SHARED_DATASET_DIR=os.path.join(tmp_dir, "shared"))
+        # Publish the shared data and write the local snapshot before measuring
+        measure(1, shared_env)
+        for mode, mode_env in (("private", env), ("shared", shared_env)):
+            for n_workers in args.workers:
+                result = dict(mode=mode, **measure(n_workers, mode_env))
+                print(
+                    "{mode:>8} {workers:>3} workers: Rss {rss_kb_per_worker:>9.0f} kB, "
+                    "Pss {pss_kb_per_worker:>9.0f} kB per worker, Pss {pss_kb_total:>10.0f} kB in total".format(
+                        **result
+                    )
+                )
+                results.append(result)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# Generates synthetic data about seals admitted to the Seehundstation Friedrichskoog with the schema of `rob.csv`. Run
+# this script with `python benchmarks/synthetic_rob.py --rows 100000 --output-dir <dir>` to write
+# `<dir>/data/deployment/rob.csv`, i.e., a directory that can be used as `ROB_LOCAL_DATA_DIR`. With `--partitioned`, the
+# data is written in the year-partitioned layout to `<dir>/data/deployment/rob/` as well.
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "app")
+)
+import partitions
+
+# Finding places at the German North Sea coast with their approximate coordinates (latitude, longitude)
+FINDING_PLACES = {
+    "Amrum": (54.6677, 8.33346),
+    "Brunsbüttel": (53.8969, 9.13963),
+    "Büsum": (54.1333, 8.85946),
+    "Cuxhaven": (53.8616, 8.69436),
+    "Dagebüll": (54.7308, 8.69316),
+    "Eiderstedt": (54.3667, 8.78333),
+    "Föhr": (54.7182, 8.5031),
+    "Friedrichskoog": (54.0009, 8.87668),
+    "Helgoland": (54.1821, 7.88546),
+    "Hooge": (54.5667, 8.55),
+    "Husum": (54.4858, 9.05239),
+    "Nordstrand": (54.4906, 8.80795),
+    "Pellworm": (54.5167, 8.65),
+    "St. Peter-Ording": (54.3035, 8.64063),
+    "Sylt": (54.9083, 8.31798),
+}
+TIERARTEN = ["Seehund", "Kegelrobbe", "sonstige"]
+TIERART_PROBABILITIES = [0.85, 0.12, 0.03]
+
+
+def _random_hex(rng: np.random.Generator, n: int) -> list:
+    """
+    Draws `n` random 64-digit hexadecimal strings like SHA-256 hashes.
+    """
+    digits = rng.bytes(32 * n).hex()
+    return [digits[i : i + 64] for i in range(0, 64 * n, 64)]
+
+
+def generate_rob(
+    n_rows: int,
+    seed: int = 0,
+    start_date: str = "1990-05-01",
+    end_date: str = "2023-01-01",
+) -> pd.DataFrame:
+    """
+    Generates synthetic data with the schema of `rob.csv`. Every animal has a history of one to four versions, created
+    at increasing `Erstellt_am`. All versions of an animal are in rehabilitation ("Reha") except for the last one, in
+    which the animal is released ("Ausgewildert") or dead ("Verstorben") unless it has been admitted within the last 90
+    days before `end_date`.
+
+    Parameters
+    ----------
+    n_rows
+        number of rows, i.e., versions of all animals.
+
+    seed
+        seed of the random number generator.
+
+    start_date
+        first admission date.
+
+    end_date
+        last admission date.
+
+    Returns
+    -------
+    A `pandas DataFrame` with the columns of `rob.csv`.
+    """
+    rng = np.random.default_rng(seed)
+    n_versions = rng.integers(1, 5, size=max(n_rows // 2, 1))
+    n_versions = n_versions[: np.searchsorted(np.cumsum(n_versions), n_rows) + 1]
+    n_versions[-1] -= n_versions.sum() - n_rows
+    n_animals = n_versions.size
+    animals = np.repeat(np.arange(n_animals), n_versions)
+    first_rows = np.cumsum(n_versions) - n_versions
+    version = np.arange(n_rows) - np.repeat(first_rows, n_versions)
+    is_last = version == np.repeat(n_versions, n_versions) - 1
+
+    # Most seal pups are admitted in summer
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    years = rng.integers(start.year, end.year + 1, size=n_animals)
+    day_of_year = np.clip(rng.normal(190, 45, size=n_animals), 0, 364).astype(int)
+    admission = (
+        pd.to_datetime(years.astype(str), format="%Y").to_numpy()
+        + day_of_year.astype("timedelta64[D]")
+    ).clip(start.to_datetime64(), end.to_datetime64())
+
+    # Versions are created when the status of an animal changes, i.e., every few days to months. The offsets in seconds
+    # are summed up per animal.
+    offsets = rng.integers(1, 120 * 86400, size=n_rows)
+    offsets[first_rows] = rng.integers(0, 3 * 86400, size=n_animals)
+    cumulative = np.cumsum(offsets)
+    cumulative -= np.repeat(cumulative[first_rows] - offsets[first_rows], n_versions)
+    erstellt_am = admission[animals] + cumulative.astype("timedelta64[s]")
+
+    is_final = is_last & (
+        admission[animals] < end.to_datetime64() - np.timedelta64(90, "D")
+    )
+    aktuell = np.where(
+        is_final,
+        np.where(rng.random(n_rows) < 0.75, "Ausgewildert", "Verstorben"),
+        "Reha",
+    )
+    places = np.array(list(FINDING_PLACES))
+    place_codes = rng.integers(0, places.size, size=n_animals)[animals]
+    coordinates = np.array(list(FINDING_PLACES.values()))
+    tierart = rng.choice(TIERARTEN, p=TIERART_PROBABILITIES, size=n_animals)[animals]
+    sys_ids = np.array(_random_hex(rng, n_animals), dtype=object)[animals]
+    return pd.DataFrame(
+        {
+            "Sys_id": sys_ids,
+            "Fundort": places[place_codes],
+            "Lat": coordinates[place_codes, 0],
+            "Long": coordinates[place_codes, 1],
+            "Einlieferungsdatum": admission[animals].astype("datetime64[ns]"),
+            "Tierart": tierart,
+            "Aktuell": aktuell,
+            "Erstellt_am": erstellt_am.astype("datetime64[ns]"),
+            "Sys_aktualisiert_am": (
+                erstellt_am
+                + rng.integers(0, 10**6, size=n_rows).astype("timedelta64[us]")
+            ).astype("datetime64[ns]"),
+            "Sys_hash": _random_hex(rng, n_rows),
+        }
+    )
+
+
+def write_rob(df_rob: pd.DataFrame, directory: str) -> str:
+    """
+    Writes the data as CSV file to `<directory>/data/deployment/rob.csv`, i.e., the layout of the S3-bucket.
+
+    Parameters
+    ----------
+    df_rob
+        data to be written.
+
+    directory
+        directory mirroring the S3-bucket.
+
+    Returns
+    -------
+    The path of the CSV file.
+    """
+    path = os.path.join(directory, "data", "deployment", "rob.csv")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df_rob.to_csv(path, index=False)
+    return path
+
+
+def write_partitioned_rob(df_rob: pd.DataFrame, directory: str) -> str:
+    """
+    Writes the data in the year-partitioned layout to `<directory>/data/deployment/rob/`, i.e., the default
+    `ROB_PARTITIONS_PREFIX` of the app.
+
+    Parameters
+    ----------
+    df_rob
+        data to be written.
+
+    directory
+        directory mirroring the S3-bucket.
+
+    Returns
+    -------
+    The directory of the partitioned layout.
+    """
+    path = os.path.join(directory, "data", "deployment", "rob")
+    partitions.write_partitions(df_rob, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generates synthetic data with the schema of rob.csv."
+    )
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output-dir", required=True, help="directory mirroring the S3-bucket"
+    )
+    parser.add_argument(
+        "--partitioned",
+        action="store_true",
+        help="also write the data in the year-partitioned layout",
+    )
+    args = parser.parse_args()
+    df_rob = generate_rob(args.rows, args.seed)
+    print(write_rob(df_rob, args.output_dir))
+    if args.partitioned:
+        print(write_partitioned_rob(df_rob, args.output_dir))
+
+
+if __name__ == "__main__":
+    main()